@@ -0,0 +1,274 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import chart_data
+import filter_engine
+import performance_trace
+import ranking
+import result_cache
+
+# Computation of the scenarios without any Streamlit elements. Every function takes a prepared dataset and a filter
+# spec and returns the tables and metrics the scenario shows, so the same code can be timed, cached or run in batch
+# jobs outside of a Streamlit script run. The scenario modules only read the sidebars and render the results.
+#
+# A filter spec maps a column to the selected values, None means the column is not filtered.
+# "Order Date" is the exception, it holds a (start date, end date) range.
+
+
+def select_rows(dataset, filters):
+    # Rows of the dataset matching the filter spec. The date range is a contiguous block of the rows sorted by
+    # order date, the other filters are applied within it with the bitmap index.
+    with performance_trace.span('filter') as record:
+        filters = dict(filters)
+        date_range = filters.pop('Order Date', None)
+        date_rows = None if date_range is None else dataset.date_range_rows(date_range[0], date_range[1])
+        df = dataset.index.filter(dataset.df, filters, date_rows)
+        record['rows'] = len(df)
+    return df
+
+
+def group_sums(dataset, filters, groupings):
+    # Sums of the measures per group of the rows matching the filter spec, one frame per (by, measures) grouping.
+    # Everything the scenarios need from the rows is computed through here: an out-of-core dataset computes the
+    # sums partition by partition from disk, an in-memory dataset groups its selected rows.
+    if dataset.out_of_core:
+        return dataset.group_sums(filters, groupings)
+
+    df = select_rows(dataset, filters)
+    return [chart_data.sum_groups(df, by, measures).reset_index() for by, measures in groupings]
+
+
+def customer_analysis(dataset, filters):
+    # Filters: Age, Segment, Order Year, Gender
+    # Profit per customer is only calculated once for the best and the worst customers
+    payment_counts, customer_profit = group_sums(dataset, filters, [
+        (['Payment Method'], ['Count']),
+        (['Customer Name'], ['Profit']),
+    ])
+    payment_counts = payment_counts.sort_values('Count', ascending=False, kind='stable').reset_index(drop=True)
+    top_customers, worst_customers = ranking.top_bottom(customer_profit, 'Profit', 5)
+
+    return {
+        'rows': int(payment_counts['Count'].sum()),
+        'top_customers': top_customers,
+        'worst_customers': worst_customers,
+        'payment_counts': payment_counts,
+    }
+
+
+def market_analysis(dataset, filters):
+    # Filters: Market, Order Year, Country
+    # Total and mean sales per market are rolled up from the pre-aggregated cube, the country filter doesn't apply
+    market_filters = {column: values for column, values in filters.items() if column != 'Country'}
+    market_summary = dataset.cube.roll_up('Market', market_filters)
+
+    # One aggregation for all selected countries instead of filtering and grouping once per country.
+    # Category and sub-category sales are rolled up from the cube, only the product sales need the rows.
+    category_sales = chart_data.split_by(
+        dataset.cube.roll_up(['Country', 'Category'], filters)[['Country', 'Category', 'Sales']], 'Country')
+    sub_category_sales = chart_data.split_by(
+        dataset.cube.roll_up(['Country', 'Sub-Category'], filters)[['Country', 'Sub-Category', 'Sales']], 'Country')
+    product_sales, = group_sums(dataset, filters, [(['Country', 'Product Name'], ['Sales'])])
+    product_sales = chart_data.split_by(product_sales, 'Country')
+
+    # Countries without rows for the filters are missing in "countries"
+    countries = {}
+    for country, products in product_sales.items():
+        top_products, _ = ranking.top_bottom(products.reset_index(drop=True), 'Sales', 5)
+        countries[country] = {
+            'category_sales': category_sales[country],
+            'sub_category_sales': sub_category_sales[country],
+            'top_products': top_products,
+        }
+
+    return {
+        'market_summary': market_summary,
+        'countries': countries,
+    }
+
+
+def sales_analysis(dataset, filters):
+    # Filters: Category, Order Year, Order Date
+    # Total sales per sub-category of the whole dataset (not filtered), rolled up from the cube
+    sales_summary = dataset.cube.roll_up('Sub-Category')[['Sub-Category', 'Sales']]
+    top_sub_categories, flop_sub_categories = ranking.top_bottom(sales_summary, 'Sales', 5)
+
+    # One grouping of the rows of all selected categories instead of filtering and grouping once per category.
+    # Categories without rows for the filters are missing in "categories".
+    category_sales, monthly_sales, product_sales = group_sums(dataset, filters, [
+        (['Category'], ['Sales', 'Count']),
+        (['Order Month', 'Category', 'Sub-Category'], ['Sales']),
+        (['Category', 'Product Name'], ['Sales']),
+    ])
+    monthly_sales = chart_data.split_by(monthly_sales, 'Category')
+    product_sales = chart_data.split_by(product_sales, 'Category')
+
+    categories = {}
+    for category, category_monthly_sales in monthly_sales.items():
+        top_products, _ = ranking.top_bottom(product_sales[category].reset_index(drop=True), 'Sales', 5)
+        categories[category] = {
+            'monthly_sales': category_monthly_sales,
+            'sub_category_sales': chart_data.sum_by(category_monthly_sales, 'Sub-Category', 'Sales'),
+            'top_products': top_products,
+        }
+
+    return {
+        'rows': int(category_sales['Count'].sum()),
+        'category_sales': category_sales[['Category', 'Sales']],
+        'top_sub_categories': top_sub_categories,
+        'flop_sub_categories': flop_sub_categories.iloc[::-1],  # Shown from highest to lowest
+        'categories': categories,
+    }
+
+
+def profit_analysis(dataset, filters):
+    # Filters: Category, Order Year, Order Date
+    monthly, market_profit, country_profit, category_profit, sub_category_profit = group_sums(dataset, filters, [
+        (['Order Month'], ['Profit', 'Sales', 'Count']),
+        (['Market'], ['Profit']),
+        (['Country'], ['Profit']),
+        (['Category'], ['Profit']),
+        (['Sub-Category'], ['Profit']),
+    ])
+    if monthly['Count'].sum() == 0:
+        return {'rows': 0}  # No profit margin without sales
+
+    total_profit = monthly['Profit'].sum()
+    total_sales = monthly['Sales'].sum()
+    expected_profit = 0.15 * total_sales  # We assume  15% of total sales as expected profit
+
+    # Months without orders are shown with 0, dates are shown at the end of the month
+    monthly_profit_trend = (monthly.set_index('Order Month')['Profit'].asfreq('MS', fill_value=0)
+                            .rename_axis('Order Date').reset_index())
+    monthly_profit_trend['Order Date'] = monthly_profit_trend['Order Date'] + pd.offsets.MonthEnd(0)
+
+    # Only the top ends of the rankings are shown
+    return {
+        'rows': int(monthly['Count'].sum()),
+        'total_profit': total_profit,
+        'profit_margin': (total_profit / total_sales) * 100,
+        'expected_profit': expected_profit,
+        'profit_diff': total_profit - expected_profit,
+        'monthly_profit_trend': monthly_profit_trend,
+        'market_profit': ranking.top_bottom(market_profit, 'Profit', 5)[0],
+        'country_profit': ranking.top_bottom(country_profit, 'Profit', 5)[0],
+        'category_profit': ranking.top_bottom(category_profit, 'Profit', 3)[0],
+        'sub_category_profit': ranking.top_bottom(sub_category_profit, 'Profit', 5)[0],
+    }
+
+
+def sorted_measure(summary, dimension, column, name):
+    # Select one measure of a cube roll-up, sorted from highest to lowest
+    return (summary[[dimension, column]].rename(columns={column: name})
+            .sort_values(by=name, ascending=False).reset_index(drop=True))
+
+
+def product_analysis(dataset, filters):
+    # Filters: Category, Sub-Category, Order Year
+    # The cube cells are filtered once and rolled up to category, sub-category and month,
+    # only the product ranking needs the rows.
+    category_summary, sub_category_summary, monthly_summary = dataset.cube.roll_up_many(
+        ['Category', 'Sub-Category', 'Order Month'], filters)
+
+    # Sales per product are only calculated once for the top and the least selling products
+    product_sales, = group_sums(dataset, filters, [(['Product Name'], ['Sales'])])
+    top_selling, least_selling = ranking.top_bottom(product_sales, 'Sales', 10)
+
+    # Months without orders are filled with 0, dates are shown at the end of the month
+    sales_trends = (monthly_summary.set_index('Order Month')['Sales'].asfreq('MS', fill_value=0)
+                    .rename_axis('Order Date').reset_index())
+    sales_trends['Order Date'] = sales_trends['Order Date'] + pd.offsets.MonthEnd(0)
+
+    return {
+        'rows': int(category_summary['Count'].sum()),
+        'top_selling': top_selling.reset_index(drop=True),
+        'least_selling': least_selling.reset_index(drop=True),
+        'sales_trends': sales_trends,
+        'sales_by_category': sorted_measure(category_summary, 'Category', 'Sales', 'Sales'),
+        'sales_by_sub_category': sorted_measure(sub_category_summary, 'Sub-Category', 'Sales', 'Sales'),
+        'profit_by_category': sorted_measure(category_summary, 'Category', 'Profit', 'Profit'),
+        'profit_by_sub_category': sorted_measure(sub_category_summary, 'Sub-Category', 'Profit', 'Profit'),
+        'avg_discount_by_category': sorted_measure(category_summary, 'Category', 'Discount Mean', 'Discount'),
+        'avg_discount_by_sub_category': sorted_measure(sub_category_summary, 'Sub-Category', 'Discount Mean',
+                                                       'Discount'),
+        'shipping_cost_by_category': sorted_measure(category_summary, 'Category', 'Shipping Cost Mean',
+                                                    'Shipping Cost'),
+        'shipping_cost_by_sub_category': sorted_measure(sub_category_summary, 'Sub-Category', 'Shipping Cost Mean',
+                                                        'Shipping Cost'),
+    }
+
+
+
+def default_filters(scenario, dataset):
+    # Filter spec a scenario starts with, the same selection its sidebar shows before the user changes anything
+    catalog = dataset.catalog
+    years = catalog.options('Order Year')
+
+    if scenario == 'customer':
+        min_age, max_age, _ = catalog.age_bounds()
+        return {'Age': range(min_age, max_age + 1), 'Segment': None,
+                'Order Year': None, 'Gender': None}
+    if scenario == 'market':
+        return {'Market': catalog.options('Market'), 'Order Year': years[-1:], 'Country': []}
+    if scenario in ('sales', 'profit'):
+        return {'Order Year': years[-1:], 'Category': catalog.options('Category'),
+                'Order Date': catalog.date_bounds(years[-1:])}
+    return {'Category': None, 'Sub-Category': None, 'Order Year': None}
+
+# Compute function of every scenario, by scenario name
+SCENARIO_ANALYSES = {
+    'customer': customer_analysis,
+    'market': market_analysis,
+    'sales': sales_analysis,
+    'profit': profit_analysis,
+    'product': product_analysis,
+}
+
+
+def analyze(scenario, dataset, filters):
+    # Results of a scenario for the filter spec, computed once per dataset version and filter state. The order of
+    # the selected values doesn't matter for the key, the result is shared by all sessions and views.
+    with performance_trace.span('aggregate', scenario=scenario) as record:
+        key = (dataset.version, scenario, filter_engine.filter_key(filters))
+        result = result_cache.results.get(key)
+        record['cache'] = 'miss' if result is None else 'hit'
+        if result is None:
+            result = SCENARIO_ANALYSES[scenario](dataset, filters)
+            result_cache.results.put(key, result)
+        return result
+
+
+# Background threads for the warm-up. Threads instead of processes, the results have to end up in the cache of
+# this process, and most of the work is done in pandas/numpy code that doesn't hold the GIL all the time.
+warm_up_pool = ThreadPoolExecutor(max_workers=len(SCENARIO_ANALYSES), thread_name_prefix='warm_up')
+warmed_up_versions = set()
+warm_up_lock = threading.Lock()
+
+
+def warm_up_scenario(scenario, dataset):
+    return analyze(scenario, dataset, default_filters(scenario, dataset))
+
+
+def report_warm_up_error(scenario, future):
+    # Nobody waits for the warm-up results, an error would be lost otherwise. The scenario is computed again (and
+    # shows the error) when it's opened.
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error warming up {scenario}: {future.exception()}")
+
+
+def warm_up(dataset):
+    # Computes the results of every scenario with its default filters in the background after an upload, while the
+    # user is still on the overview page. Opening a scenario for the first time then reads them from the cache.
+    # Every dataset version is only warmed up once per process.
+    with warm_up_lock:
+        if dataset.version in warmed_up_versions:
+            return []
+        warmed_up_versions.add(dataset.version)
+
+    futures = []
+    for scenario in SCENARIO_ANALYSES:
+        future = warm_up_pool.submit(warm_up_scenario, scenario, dataset)
+        future.add_done_callback(functools.partial(report_warm_up_error, scenario))
+        futures.append(future)
+    return futures
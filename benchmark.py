@@ -0,0 +1,98 @@
+import argparse
+import os
+import time
+import tracemalloc
+import analytics
+import data_loader
+import prepared_dataset
+import synthetic_data
+
+# Times the ingestion of a synthetic dataset and the filtering and aggregation of every scenario with its default
+# filters, and reports the peak memory allocated by each step. Run e.g. "python benchmark.py 100k 1m".
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".benchmark_data")
+
+
+def measure(func, *args):
+    # Returns the result of func, its run time in seconds and the peak memory allocated while it ran in bytes.
+    # Tracing the allocations slows down the parsing considerably, so the time is taken in a separate untraced run.
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def dataset_file(size, data_dir=DATA_DIR):
+    # Synthetic datasets are generated once and reused by later runs
+    path = os.path.join(data_dir, f"superstore_{size}-v{synthetic_data.GENERATOR_VERSION}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        synthetic_data.write_dataset(path, synthetic_data.SIZES[size])
+    return path
+
+
+def run(path):
+    # Results as (step, seconds, peak bytes), in the order the app runs the steps
+    results = []
+
+    df, seconds, peak = measure(data_loader.read_superstore_csv, path)
+    results.append(("ingest", seconds, peak))
+
+    dataset, seconds, peak = measure(prepared_dataset.PreparedDataset, df, path)
+    results.append(("prepare", seconds, peak))
+
+    for scenario, analysis in analytics.SCENARIO_ANALYSES.items():
+        filters = analytics.default_filters(scenario, dataset)
+        _, seconds, peak = measure(analysis, dataset, filters)
+        results.append((scenario, seconds, peak))
+
+    return results
+
+
+# Types of the columns before the compact representation, the "before" side of the memory report
+PLAIN_DTYPES = {
+    **{column: "object" for column in data_loader.DICTIONARY_COLUMNS},
+    "Postal Code": "float64",
+    "Quantity": "int64",
+    "Discount": "float64",
+}
+
+
+def memory_report(path):
+    # Bytes per column of the prepared dataset with plain object strings and 64 bit numbers and with the compact
+    # types, as (column, bytes before, bytes after) rows with the total in the last row
+    df = prepared_dataset.PreparedDataset.prepare(data_loader.read_superstore_csv(path))
+    after = df.memory_usage(index=False, deep=True)
+    before = df.astype(PLAIN_DTYPES).memory_usage(index=False, deep=True)
+    return [(column, before[column], after[column]) for column in df.columns] + [("total", before.sum(), after.sum())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and the scenarios on synthetic datasets.")
+    parser.add_argument("sizes", nargs="*", default=["100k", "1m"], choices=synthetic_data.SIZES,
+                        help="dataset sizes to benchmark (default: 100k 1m)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory of the generated datasets")
+    parser.add_argument("--memory", action="store_true",
+                        help="report the memory per column of the prepared dataset instead of the timings")
+    args = parser.parse_args()
+
+    if args.memory:
+        print(f"{'size':>6}  {'column':<14} {'before MB':>10} {'after MB':>10}")
+        for size in args.sizes:
+            for column, before, after in memory_report(dataset_file(size, args.data_dir)):
+                print(f"{size:>6}  {column:<14} {before / 2 ** 20:>10.2f} {after / 2 ** 20:>10.2f}")
+        return
+
+    print(f"{'size':>6}  {'step':<10} {'seconds':>9} {'peak MB':>9}")
+    for size in args.sizes:
+        for step, seconds, peak in run(dataset_file(size, args.data_dir)):
+            print(f"{size:>6}  {step:<10} {seconds:>9.3f} {peak / 2 ** 20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
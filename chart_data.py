@@ -0,0 +1,33 @@
+import pandas as pd
+
+# Charts get their data already aggregated, so only one row per bar/point and the encoded columns are sent to the
+# browser instead of every filtered row with all columns.
+
+
+def sum_by(df, by, measure):
+    # Total of measure per group
+    by = [by] if isinstance(by, str) else list(by)
+    return df.groupby(by, observed=True)[measure].sum().reset_index()
+
+
+def split_by(df, column):
+    # Splits an aggregated frame into one part per value of column (e.g. one part per category panel)
+    return {value: part.drop(columns=column) for value, part in df.groupby(column, observed=True)}
+
+
+def sum_groups(df, by, measures):
+    # Sums of several measures per group, indexed by the group. "Count" is the number of rows of the group.
+    grouped = df.groupby(by, observed=True)
+    sums = grouped[[measure for measure in measures if measure != 'Count']].sum()
+    if 'Count' in measures:
+        sums['Count'] = grouped.size()
+    return sums[measures]
+
+
+def merge_sums(parts, by, measures):
+    # Combines group sums of different parts of the rows (all measures of sum_groups are additive)
+    if not parts:
+        return pd.DataFrame(columns=by + measures).astype({measure: 'float64' for measure in measures})
+    if len(parts) == 1:
+        return parts[0].reset_index()
+    return pd.concat(parts).groupby(level=list(range(len(by))), observed=True).sum().reset_index()
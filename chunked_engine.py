@@ -0,0 +1,198 @@
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+import chart_data
+import column_catalog
+import data_loader
+import dataset_cache
+import olap_cube
+import performance_trace
+import prepared_dataset
+
+# Out-of-core mode for files larger than the memory of the dashboard host. The file is read in chunks, every chunk
+# is prepared and spilled to disk as one Feather partition per order year. Only small structures stay in memory:
+# the OLAP cube and the column catalog for the sidebars (both merged chunk by chunk) and the date range of every
+# partition. Group sums over the rows are computed partition by partition and merged.
+
+SPILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chunk_spill")
+
+# Partitions of the datasets of this process, see dataset_cache.process_directory
+PROCESS_SPILL_DIR = dataset_cache.process_directory(SPILL_DIR)
+
+# Max size of the partitions of all datasets of a process together in GB, e.g. DASHBOARD_SPILL_GB=200. The partitions of the
+# least recently used datasets are removed when it gets bigger.
+MAX_SPILL_BYTES = int(os.environ.get("DASHBOARD_SPILL_GB", "50")) * 1024 ** 3
+
+# Rows read and prepared at once
+CHUNK_ROWS = 250_000
+
+# Partial group sums are merged after this many partitions, so they don't pile up for large files
+MERGE_EVERY = 8
+
+
+class PartitionsRemovedError(RuntimeError):
+    pass
+
+
+def file_version(path):
+    # Hashing the content of a file larger than memory takes too long, path, size and modification time are used
+    stat = os.stat(path)
+    return dataset_cache.content_hash(f"{os.path.abspath(path)}{stat.st_size}{stat.st_mtime_ns}".encode())
+
+
+class OutOfCoreDataset:
+    # Same interface for the scenarios as PreparedDataset, but the rows stay on disk
+    out_of_core = True
+
+    def __init__(self, path, version, chunk_rows=CHUNK_ROWS):
+        missing_columns = data_loader.find_missing_columns(pd.read_csv(path, nrows=0).columns)
+        if missing_columns:
+            raise ValueError(f"Missing columns: {', '.join(missing_columns)}")
+
+        self.version = version
+        # Own directory for every build, a session can still use an earlier build of the same file. The partitions
+        # are removed together with the dataset (also if the build fails), when it was dropped from the shared
+        # datasets and no session uses it anymore.
+        os.makedirs(PROCESS_SPILL_DIR, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix=f"{version}-", dir=PROCESS_SPILL_DIR)
+        weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+
+        self.partitions = []  # Path, year, first and last order date of every partition
+        self.cube = None
+        self.catalog = None
+        self.df = None  # Only the first rows of the file are kept in memory, they are shown after the upload
+        self.n_rows = 0
+
+        for number, chunk in enumerate(data_loader.read_superstore_chunks(path, chunk_rows)):
+            chunk = prepared_dataset.PreparedDataset.prepare(chunk)
+            if chunk.empty:
+                continue
+            self.n_rows += len(chunk)
+            if self.df is None:
+                self.df = chunk.head(1000).copy()  # Copy, a slice would keep the whole chunk alive
+
+            # The cube cells of the chunk are merged into the cells of the chunks before (all measures are additive)
+            self.cube = olap_cube.OlapCube(chunk) if self.cube is None else self.cube.append(chunk)
+            self.catalog = (column_catalog.ColumnCatalog(chunk) if self.catalog is None
+                            else self.catalog.append(chunk))
+
+            for year, rows in chunk.groupby('Order Year'):
+                self.spill(number, year, rows)
+
+        if self.cube is None:
+            raise ValueError("the file doesn't contain any orders")
+
+    def spill(self, number, year, rows):
+        path = os.path.join(self.directory, f"{year}-{number:06d}.feather")
+        feather.write_feather(pa.Table.from_pandas(rows, preserve_index=False), path)
+        self.partitions.append({
+            'path': path,
+            'year': year,
+            'first_date': rows['Order Date'].min(),
+            'last_date': rows['Order Date'].max(),
+        })
+
+    def selected_partitions(self, years, date_range):
+        # Partitions that can contain rows of the selected years and date range, the others aren't read
+        for partition in self.partitions:
+            if years is not None and partition['year'] not in years:
+                continue
+            if date_range is not None and (partition['last_date'] < pd.Timestamp(date_range[0])
+                                           or partition['first_date'] > pd.Timestamp(date_range[1])):
+                continue
+            yield partition
+
+    def read_rows(self, partition, filters, date_range, columns):
+        # Rows of one partition matching the filters, only the needed columns are read from disk
+        df = feather.read_table(partition['path'], columns=columns, memory_map=True).to_pandas()
+
+        mask = np.ones(len(df), dtype=bool)
+        for column, values in filters.items():
+            if values is not None:
+                mask &= df[column].isin(values).to_numpy()
+        if date_range is not None:
+            order_dates = df['Order Date']
+            mask &= ((order_dates >= pd.Timestamp(date_range[0])) & (order_dates <= pd.Timestamp(date_range[1]))
+                     ).to_numpy()
+
+        return df[mask]
+
+    def group_sums(self, filters, groupings):
+        # Same result as analytics.group_sums for in-memory datasets. The sums of every partition are kept per
+        # grouping and merged with the sums of the partitions before, so only the group sums are in memory.
+        filters = dict(filters)
+        date_range = filters.pop('Order Date', None)
+
+        columns = set(filters)
+        for by, measures in groupings:
+            columns.update(by)
+            columns.update(measure for measure in measures if measure != 'Count')
+        if date_range is not None:
+            columns.add('Order Date')
+
+        if not os.path.isdir(self.directory):
+            raise PartitionsRemovedError("The partitions of this file were removed to free disk space, please open it again")
+        os.utime(self.directory)  # Mark as recently used for the eviction
+
+        parts = [[] for _ in groupings]
+        with performance_trace.span('filter', out_of_core=True) as record:
+            record['partitions'] = record['rows'] = 0
+            for partition in self.selected_partitions(filters.get('Order Year'), date_range):
+                df = self.read_rows(partition, filters, date_range, sorted(columns))
+                record['partitions'] += 1
+                record['rows'] += len(df)
+
+                for grouping_parts, (by, measures) in zip(parts, groupings):
+                    grouping_parts.append(chart_data.sum_groups(df, by, measures))
+                    if len(grouping_parts) >= MERGE_EVERY:
+                        grouping_parts[:] = [chart_data.merge_sums(grouping_parts, by, measures).set_index(by)]
+
+        return [chart_data.merge_sums(grouping_parts, by, measures)
+                for grouping_parts, (by, measures) in zip(parts, groupings)]
+
+
+def directory_bytes(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+
+def evict(keep=None, max_bytes=MAX_SPILL_BYTES):
+    # Removes the partitions of the least recently used datasets until all partitions fit into the size limit.
+    # Sessions still using an evicted dataset have to open the file again.
+    if not os.path.isdir(PROCESS_SPILL_DIR):
+        return
+
+    entries = []
+    for entry in os.scandir(PROCESS_SPILL_DIR):
+        if entry.is_dir():
+            entries.append((entry.stat().st_mtime, directory_bytes(entry.path), entry.path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, directory in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        if directory == keep:
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        total_size -= size
+
+
+def build_large_dataset(path, version):
+    dataset = OutOfCoreDataset(path, version)
+    evict(keep=dataset.directory)
+    return dataset
+
+
+def load_large_dataset(path):
+    # Out-of-core dataset of a file on the server, shared by all sessions like an uploaded file
+    version = file_version(path)
+    shared_dataset = prepared_dataset.get_shared_dataset(version, lambda: build_large_dataset(path, version))
+    return prepared_dataset.DatasetView(shared_dataset)
+
+
+# Partitions left by server processes that don't run anymore (e.g. before a restart)
+dataset_cache.remove_stale_directories(SPILL_DIR)
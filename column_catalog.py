@@ -0,0 +1,106 @@
+import pandas as pd
+
+# Columns the sidebars offer as options
+OPTION_COLUMNS = ["Order Year", "Market", "Country", "Category", "Sub-Category", "Segment", "Gender"]
+
+# Cascading sidebar filters: the options of a column only contain the values that occur together with the values
+# selected for the columns before it
+HIERARCHIES = {
+    "market": ["Market", "Order Year", "Country"],
+    "product": ["Category", "Sub-Category", "Order Year"],
+}
+
+
+def add_combinations(tree, df, columns):
+    # Adds the distinct value combinations of columns in df as paths to a tree of nested dicts
+    combinations = df[columns].dropna().drop_duplicates()
+    for values in zip(*(combinations[column].tolist() for column in columns)):
+        node = tree
+        for value in values:
+            node = node.setdefault(value, {})
+
+
+def cascade_values(tree, selections):
+    # Values of the level below the selected values of the levels before, None selects all values of a level
+    if not selections:
+        return set(tree)
+    values = set()
+    for value, subtree in tree.items():
+        if selections[0] is None or value in selections[0]:
+            values |= cascade_values(subtree, selections[1:])
+    return values
+
+
+def copy_tree(tree, target):
+    for value, subtree in tree.items():
+        copy_tree(subtree, target.setdefault(value, {}))
+
+
+def combine(function, *values):
+    # min/max of the values that aren't missing (e.g. the min age of no rows), missing if all of them are
+    values = [int(value) for value in values if value is not None and pd.notna(value)]
+    return function(values) if values else float('nan')
+
+
+class ColumnCatalog:
+    # Statistics of the columns the sidebars need: distinct values, date range of every year, age range and the
+    # cascading hierarchies. Built once when a dataset is loaded, so the sidebars only look up their options and
+    # slider bounds instead of scanning the columns on every rerun.
+    def __init__(self, df):
+        self.values = {}
+        self.year_dates = {}
+        self.hierarchies = {name: {} for name in HIERARCHIES}
+        self.min_age = self.max_age = self.min_age_customer = None
+        self.add_rows(df)
+
+    def append(self, df_new):
+        # New catalog with the statistics of the rows of df_new added, the rows before aren't scanned again
+        catalog = ColumnCatalog.__new__(ColumnCatalog)
+        catalog.values = {column: set(values) for column, values in self.values.items()}
+        catalog.year_dates = dict(self.year_dates)
+        catalog.hierarchies = {name: {} for name in HIERARCHIES}
+        for name, tree in self.hierarchies.items():
+            copy_tree(tree, catalog.hierarchies[name])
+        catalog.min_age, catalog.max_age, catalog.min_age_customer = self.min_age, self.max_age, self.min_age_customer
+        catalog.add_rows(df_new)
+        return catalog
+
+    def add_rows(self, df):
+        for column in OPTION_COLUMNS:
+            if column in df.columns:  # Gender is an optional column
+                self.values.setdefault(column, set()).update(df[column].dropna().unique().tolist())
+
+        dates = df.groupby('Order Year')['Order Date'].agg(['min', 'max'])
+        for year, first_date, last_date in zip(dates.index.tolist(), dates['min'], dates['max']):
+            if year in self.year_dates:
+                first_date = min(first_date, self.year_dates[year][0])
+                last_date = max(last_date, self.year_dates[year][1])
+            self.year_dates[year] = (first_date, last_date)
+
+        for name, columns in HIERARCHIES.items():
+            add_combinations(self.hierarchies[name], df, columns)
+
+        consumer_ages = df.loc[df['Segment'] == 'Consumer', 'Age']
+        self.min_age = combine(min, df['Age'].min(), self.min_age)
+        self.max_age = combine(max, df['Age'].max(), self.max_age)
+        self.min_age_customer = combine(min, consumer_ages.min(), self.min_age_customer)
+
+    def options(self, column):
+        # Sorted distinct values of a column
+        return sorted(self.values.get(column, ()))
+
+    def cascade_options(self, hierarchy, selections):
+        # Sorted options of the next column of a hierarchy for the selections of the columns before it, e.g.
+        # cascade_options('product', [categories]) gives the sub-categories of the selected categories
+        return sorted(cascade_values(self.hierarchies[hierarchy], selections))
+
+    def age_bounds(self):
+        # Age range of all customers and min age within the consumer segment
+        return self.min_age, self.max_age, self.min_age_customer
+
+    def date_bounds(self, years):
+        # First and last order date of the selected years, as date objects for the date slider
+        bounds = [self.year_dates[year] for year in years if year in self.year_dates]
+        first_date = min(first_date for first_date, _ in bounds)
+        last_date = max(last_date for _, last_date in bounds)
+        return pd.Timestamp(first_date).date(), pd.Timestamp(last_date).date()
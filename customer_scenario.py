@@ -1,33 +1,25 @@
+import io
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import altair as alt
+import analytics
+import performance_trace
 
 
-def create_age_column():
-    if st.session_state.df is not None:  # Checking if session state df is not empty
-        df = st.session_state.df  # assigning session state df to variable "df"
+@st.cache_data(max_entries=50, show_spinner=False)
+def payment_pie_png(payment_counts):
+    # Pie chart of the payment methods as PNG. Cached by the content of payment_counts, so a figure is only drawn
+    # for counts that weren't shown before (least recently used entries are dropped first).
+    # The figure is not registered with pyplot, so it is freed as soon as the image is saved.
+    fig = Figure()
+    ax = fig.subplots()
+    ax.pie(payment_counts['Count'], labels=payment_counts['Payment Method'], autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
 
-        # Calculating the age of the customers
-
-        # Convert 'Date of Birth' column to datetime format
-        df['Customer DOB'] = pd.to_datetime(df['Customer DOB'])
-
-        # Calculate the current date
-        current_date = pd.to_datetime('today')
-
-        # Handle the missing date of birth cels and make them age 0
-        df['Customer DOB'].fillna(pd.to_datetime(current_date), inplace=True)
-
-        # Calculating the age --> used ChatGPT to come up with this idea
-        df['Age'] = df['Customer DOB'].apply(
-            lambda dob: current_date.year - dob.year - ((current_date.month, current_date.day) < (dob.month, dob.day)))
-
-        df['Age'] = df['Age'].astype(int)
-
-        age_range = df['Age']
-
-        return age_range
+    # Same image settings as st.pyplot
+    image = io.BytesIO()
+    fig.savefig(image, format='png', bbox_inches='tight', dpi=200)
+    return image.getvalue()
 
 
 def customer_logic():
@@ -38,15 +30,11 @@ def customer_logic():
     st.write("")
 
 
-    if st.session_state.df is not None:  # Checking if session state df is not empty
-        df = st.session_state.df  # assigning session state df to variable "df"
-        create_age_column()
-
-        # Filter the DataFrame for the segment "Customer" to get the min age for the warning display
-        min_df = df[df['Segment'] == 'Consumer']
+    if st.session_state.get('dataset') is not None:  # Checking if session state dataset is not empty
+        catalog = st.session_state.dataset.catalog  # Options and bounds of the filters, collected when loading
 
-        # Find the minimum age within the filtered DataFrame
-        min_age_customer = min_df['Age'].min()
+        # Age range of all customers and min age within the consumer segment
+        min_age, max_age, min_age_customer = catalog.age_bounds()
 
         # Sidebar for Segment Filter
         with st.sidebar:
@@ -57,7 +45,7 @@ def customer_logic():
                 "The visualizations and data tables will dynamically update to reflect your selections.")
             st.write("")
             st.subheader("Filter by Customer Segment")
-            seg_type = df['Segment'].unique()
+            seg_type = catalog.options('Segment')
             selected_seg = [st.checkbox(segment, key=segment) for segment in seg_type]
 
         # Create lists of selected segments
@@ -66,7 +54,7 @@ def customer_logic():
         # Create sidebar menu for gender selection
         with st.sidebar:
             st.subheader("Filter by Gender")
-            gender_type = [g_type for g_type in df['Gender'].unique()]
+            gender_type = catalog.options('Gender')
             selected_gender = [st.checkbox(gender, key=gender) for gender in gender_type]
 
         # Create lists of selected gender
@@ -74,79 +62,36 @@ def customer_logic():
 
         with st.sidebar:
             st.subheader("Filter by Age Range")
-            # Check if corporate checkbox is selected (Maybe different way possible?)
-            if selected_seg[1]:
+            # Check if corporate checkbox is selected
+            if 'Corporate' in selected_segment_list:
                 st.info('Note: Corporate customers have their age set to 0.', icon="ℹ️")
-            age_slider = st.slider("Age Range ", min_value=min(create_age_column()), max_value=max(create_age_column()),
-                                   value=(min(create_age_column()), max(create_age_column())))
+            age_slider = st.slider("Age Range ", min_value=min_age, max_value=max_age, value=(min_age, max_age))
 
         # Store min and max values from slider in variables
         selected_min_age, selected_max_age = age_slider
 
         # sidebar menu to select years
         with st.sidebar.subheader('Filter by relevant Year(s)'):
-            # Ensure the sales date column is in datetime format
-            df['Order Date'] = pd.to_datetime(df['Order Date'])
-
-            # Extract the year from the sales date
-            df['Order Year'] = df['Order Date'].dt.year
-
             # Get unique sales years
-            unique_years = df['Order Year'].unique()
+            unique_years = catalog.options('Order Year')
 
             # create sidebar selection with the years
             year_select = st.sidebar.multiselect('Select Year(s)', options=unique_years)
 
-        # Prefilter the data based on the selected Age range via the age_slider!
-        df = df[(df['Age'] >= selected_min_age) & (df['Age'] <= selected_max_age)]
-
-        # Filter the DataFrame based on selected segment, year, and gender
-        if selected_segment_list and year_select and selected_gender_list:
-            filtered_df = df[
-                (df['Segment'].isin(selected_segment_list) & df['Order Year'].isin(year_select)
-                 & df['Gender'].isin(selected_gender_list))
-            ]
-
-        elif selected_segment_list and year_select:
-            filtered_df = df[
-                (df['Segment'].isin(selected_segment_list) & df['Order Year'].isin(year_select))
-            ]
-
-        elif selected_segment_list and selected_gender_list:
-            filtered_df = df[
-                (df['Segment'].isin(selected_segment_list) & df['Gender'].isin(selected_gender_list))
-            ]
-
-        elif selected_gender_list and year_select:
-            filtered_df = df[
-                (df['Order Year'].isin(year_select)
-                 & df['Gender'].isin(selected_gender_list))
-            ]
-
-        elif selected_segment_list:
-            filtered_df = df[df['Segment'].isin(selected_segment_list)]
-
-        elif year_select:
-            filtered_df = df[df['Order Year'].isin(year_select)]
-
-        elif selected_gender_list:
-            filtered_df = df[df['Gender'].isin(selected_gender_list)]
-
-        else:
-            filtered_df = df  # If no filters selected, use original/unfiltered df
-
-        payment_counts = filtered_df['Payment Method'].value_counts().reset_index()
-        payment_counts.columns = ['Payment Method', 'Count']
-
-        # Code to identify best customers
-        most_profitable_cus = filtered_df.groupby('Customer Name')['Profit'].sum().reset_index()
-        top_profitable_cus = most_profitable_cus.sort_values(by='Profit', ascending=False).head(5)
-
-        # Code to identify the worst customers
-        least_profitable_cus = filtered_df.groupby('Customer Name')['Profit'].sum().reset_index()
-        top_worst_cus = least_profitable_cus.sort_values(by='Profit', ascending=True).head(5)
-
-        if filtered_df.empty:
+        # Filter the DataFrame based on the selected age range, segment, year, and gender.
+        # Filters without a selection are not applied.
+        customer_filters = {
+            'Age': range(selected_min_age, selected_max_age + 1),
+            'Segment': selected_segment_list or None,
+            'Order Year': year_select or None,
+            'Gender': selected_gender_list or None,
+        }
+        results = analytics.analyze('customer', st.session_state.dataset, customer_filters)
+        top_profitable_cus = results['top_customers']
+        top_worst_cus = results['worst_customers']
+        payment_counts = results['payment_counts']
+
+        if results['rows'] == 0:
             st.warning(f"Age filter set to low. The min age for consumer segment is {min_age_customer} :warning:",
                        icon='⚠️')
 
@@ -169,27 +114,25 @@ def customer_logic():
             col3, col4 = st.columns(2)
             with col3:
                 # Display the bar chart showing the usage of the payment methods
-                payment_method = alt.Chart(filtered_df).mark_bar().encode(
+                payment_method = alt.Chart(payment_counts).mark_bar().encode(
                     x=alt.X('Payment Method:O', sort='-y', title='Payment Method'),
-                    y=alt.Y('count(Payment Method):Q', title='Amount used'),
+                    y=alt.Y('Count:Q', title='Amount used'),
                     color='Payment Method:N',
-                    tooltip=['Payment Method', 'count(Payment Method)']
+                    tooltip=['Payment Method', 'Count']
                 ).properties(
                     width=600,
                     height=400
                 )
 
-                st.altair_chart(payment_method, use_container_width=True)
+                performance_trace.altair_chart(payment_method, use_container_width=True)
 
             with col4:
                 # Display a pie chart of to visualize the payment method distribution
-                fig, ax = plt.subplots()
-                ax.pie(payment_counts['Count'], labels=payment_counts['Payment Method'], autopct='%1.1f%%',
-                       startangle=90)
-                ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+                with performance_trace.span('chart-build', element='pie'):
+                    pie_chart = payment_pie_png(payment_counts)
 
                 # Display the pie chart in Streamlit
-                st.pyplot(fig)
+                performance_trace.image(pie_chart, use_column_width=True)
 
     else:
         st.error("No data loaded. Please upload a CSV file.")
@@ -0,0 +1,115 @@
+import pandas as pd
+
+# Define required columns as a constant variable
+REQUIRED_COLUMNS = [
+    "Order Date", "Ship Date", "Ship Mode", "Customer Name", "Customer DOB", "Segment", "City", "State",
+    "Country",
+    "Postal Code", "Market", "Region", "Product ID", "Category", "Sub-Category", "Product Name", "Sales",
+    "Quantity", "Discount", "Profit", "Shipping Cost", "Order Priority", "Payment Method"
+]
+
+# Low cardinality text columns are stored as categories (integer codes instead of one string per row)
+CATEGORICAL_COLUMNS = [
+    "Segment", "Market", "Region", "Category", "Sub-Category", "Ship Mode", "Order Priority", "Payment Method",
+    "Gender"
+]
+
+# High cardinality text columns are dictionary encoded as well. Every name is repeated on many rows, so the codes
+# plus one string per distinct value take a fraction of the memory of one string object per row, and grouping by
+# them works on the codes.
+DICTIONARY_COLUMNS = ["Customer Name", "City", "State", "Country", "Product ID", "Product Name"]
+
+# Explicit dtypes, so pandas doesn't have to guess the type of every column while parsing.
+# Numbers are stored in the smallest type that holds them exactly: quantities are small integers, discounts have at
+# most 3 decimals and postal codes have at most 5 digits (missing for many countries, hence the nullable type).
+COLUMN_DTYPES = {
+    "Postal Code": "Int32",
+    "Sales": "float64",
+    "Quantity": "int16",
+    "Discount": "float32",
+    "Profit": "float64",
+    "Shipping Cost": "float64",
+    # Read as categories, so parse_dates only has to convert the distinct dates
+    "Order Date": "category",
+    "Ship Date": "category",
+    "Customer DOB": "category",
+    **{column: "category" for column in CATEGORICAL_COLUMNS + DICTIONARY_COLUMNS}
+}
+
+# Known date formats of the superstore export
+DATE_FORMATS = {
+    "Order Date": "%d %m %Y",
+    "Ship Date": "%d %m %Y",
+    "Customer DOB": "%Y-%m-%d",
+}
+
+
+def read_header(file):
+    # Only parse the header line, the file position is reset afterwards so the file can be read again
+    header = pd.read_csv(file, nrows=0).columns.tolist()
+    file.seek(0)
+    return header
+
+
+def find_missing_columns(header):
+    # Check if each required column is in file. If not, add it to this list.
+    return [col for col in REQUIRED_COLUMNS if col not in header]
+
+
+def parse_date_values(values, date_format):
+    # Dates in the known format, other formats are inferred (e.g. 2013-02-05), values that are no date give NaT
+    dates = pd.to_datetime(values, format=date_format, errors="coerce")
+    other_format = dates.isna() & values.notna()
+    if other_format.any():
+        dates = dates.where(~other_format, pd.to_datetime(values, format="mixed", errors="coerce"))
+    return dates
+
+
+def parse_dates(df):
+    # A date column only has a few thousand distinct values (but they aren't sorted, so pandas can't cache them
+    # while parsing). Every distinct value is parsed once and the dates are mapped back to the rows by their codes.
+    for column, date_format in DATE_FORMATS.items():
+        if column not in df.columns:
+            continue
+        values = df[column].astype("category")
+        categories = values.cat.categories.to_series(index=None)
+        dates = parse_date_values(categories, date_format)
+
+        if column == "Order Date" and dates.isna().any():
+            # Rows without an order date can't be shown in any scenario. An order date that can't be read means
+            # the file is in an unknown format, it is rejected instead of silently losing those rows.
+            invalid = categories[dates.isna().to_numpy()]
+            raise ValueError(f"{values.isin(invalid).sum()} order dates could not be read "
+                             f"(e.g. '{invalid.iloc[0]}'), expected format: day month year")
+
+        # Code -1 (missing value) takes the NaT appended at the end
+        dates = pd.DatetimeIndex(dates).append(pd.DatetimeIndex([pd.NaT]))
+        df[column] = pd.Series(dates[values.cat.codes.to_numpy()], index=df.index)
+    return df
+
+
+def concat_rows(df, df_new):
+    # Appends the rows of df_new to df. Categorical columns are combined with union_categoricals,
+    # a plain concat would turn them into object columns when the categories differ.
+    columns = {}
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            new_values = df_new[column].astype("category")
+            columns[column] = pd.api.types.union_categoricals([df[column], new_values], sort_categories=True,
+                                                              ignore_order=True)
+        else:
+            columns[column] = pd.concat([df[column], df_new[column]], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def read_superstore_csv(file):
+    # Single pass over the file with the dtype map, dates are converted right after parsing
+    df = pd.read_csv(file, dtype=COLUMN_DTYPES)
+    return parse_dates(df)
+
+
+def read_superstore_chunks(path, chunk_rows):
+    # Same as read_superstore_csv, but the file is read in blocks of chunk_rows rows, so it never has to fit
+    # in memory as a whole
+    for df in pd.read_csv(path, dtype=COLUMN_DTYPES, chunksize=chunk_rows):
+        yield parse_dates(df)
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import shutil
+import pyarrow.feather as feather
+
+# Parsed datasets are stored as Feather files next to the app, named after the hash of the uploaded bytes
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".dataset_cache")
+
+# Max size of the cache directory, the least recently used files are removed when it gets bigger
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+# Part of the file names, increased when the column types of the parsed datasets change. Files of earlier versions
+# are not read anymore, the CSV is parsed again and they are evicted like any other unused file.
+FORMAT_VERSION = 2
+
+
+def content_hash(content: bytes):
+    # Same file content always gives the same key, no matter how the file is called
+    return hashlib.sha256(content).hexdigest()
+
+
+def cache_path(key):
+    return os.path.join(CACHE_DIR, f"{key}-v{FORMAT_VERSION}.feather")
+
+
+def load(key):
+    path = cache_path(key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        # Memory-mapped read, the file is not copied into a buffer before it is converted
+        df = feather.read_table(path, memory_map=True).to_pandas()
+    except Exception as e:
+        # Broken cache file (e.g. server stopped while writing), remove it and parse the CSV again
+        print(f"Error reading cached dataset {key}: {e}")
+        os.remove(path)
+        return None
+
+    os.utime(path)  # Mark file as recently used for the LRU eviction
+    return df
+
+
+def store(key, df):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(key)
+    tmp_path = f"{path}.tmp"
+
+    # Write to a temporary file first, so other sessions never read a half written file
+    df.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, path)
+
+    evict(keep=key)
+
+
+def evict(keep=None, max_bytes=MAX_CACHE_BYTES):
+    if not os.path.isdir(CACHE_DIR):
+        return
+
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".feather"):
+            stat = os.stat(os.path.join(CACHE_DIR, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    # Remove the least recently used files until the cache fits into the size limit
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        if keep is not None and name == os.path.basename(cache_path(keep)):
+            continue
+        os.remove(os.path.join(CACHE_DIR, name))
+        total_size -= size
+
+
+def process_directory(parent):
+    # Directory of this server process below parent (e.g. for the spilled partitions). Every process only writes to
+    # and removes its own directory, so a second dashboard process or a job using the same checkout never removes the
+    # files of datasets another process is still using.
+    return os.path.join(parent, str(os.getpid()))
+
+
+def process_running(pid):
+    try:
+        os.kill(pid, 0)  # Signal 0 only checks if the process exists
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Process of another user
+    return True
+
+
+def remove_stale_directories(parent):
+    # Removes the process directories below parent of processes that don't run anymore (e.g. the server before a
+    # restart), their datasets don't exist anymore
+    if not os.path.isdir(parent):
+        return
+    for entry in os.scandir(parent):
+        if entry.is_dir() and entry.name.isdigit() and not process_running(int(entry.name)):
+            shutil.rmtree(entry.path, ignore_errors=True)
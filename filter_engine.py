@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Columns the sidebars filter on, every distinct value of these columns gets its own bitmap
+INDEXED_COLUMNS = ["Order Year", "Market", "Country", "Category", "Sub-Category", "Segment", "Gender", "Age"]
+
+
+class BitmapIndex:
+    # Every indexed column is encoded as integer codes, and for every distinct value a packed bitmap
+    # (one bit per row) marks the rows with that value. A filter is then a few bitwise operations on the bitmaps
+    # instead of comparing the values of every row.
+    def __init__(self, df, columns=None):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+
+        for column in columns or INDEXED_COLUMNS:
+            if column not in df.columns:
+                continue  # Gender is an optional column
+            codes, uniques = pd.factorize(df[column])
+            self.bitmaps[column] = {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+
+    def append(self, df_new):
+        # New index with the rows of df_new added after the existing rows. Only the last, partly used byte of the
+        # existing bitmaps is unpacked, the full bytes are copied as they are.
+        index = BitmapIndex.__new__(BitmapIndex)
+        index.n_rows = self.n_rows + len(df_new)
+        index.bitmaps = {}
+
+        full_bytes, tail_bits = divmod(self.n_rows, 8)
+        no_rows = np.zeros(len(df_new), dtype=bool)
+
+        for column, bitmaps in self.bitmaps.items():
+            codes, uniques = pd.factorize(df_new[column])
+            new_rows = {value: codes == code for code, value in enumerate(uniques)}
+
+            index.bitmaps[column] = {}
+            for value in list(bitmaps) + [value for value in new_rows if value not in bitmaps]:
+                bitmap = bitmaps.get(value)
+                if bitmap is None:
+                    bitmap = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)  # Value is new in df_new
+                tail = np.unpackbits(bitmap[full_bytes:], count=tail_bits).astype(bool)
+                new_bits = np.packbits(np.concatenate([tail, new_rows.get(value, no_rows)]))
+                index.bitmaps[column][value] = np.concatenate([bitmap[:full_bytes], new_bits])
+
+        return index
+
+    def column_bitmap(self, column, values, byte_range):
+        # Rows that have one of the selected values (OR within the column)
+        bitmap = np.zeros(byte_range.stop - byte_range.start, dtype=np.uint8)
+        for value in values:
+            value_bitmap = self.bitmaps[column].get(value)
+            if value_bitmap is not None:
+                bitmap |= value_bitmap[byte_range]
+        return bitmap
+
+    def select(self, filters, row_range=None):
+        # filters maps a column to the selected values, None means the column is not filtered.
+        # Columns are combined with AND. Returns the positions of the matching rows, or None if nothing is filtered.
+        # With a row_range (slice of row positions) only the bytes of the bitmaps covering that range are used.
+        start, stop = (0, self.n_rows) if row_range is None else (row_range.start, row_range.stop)
+        first_byte = start // 8
+        byte_range = slice(first_byte, (stop + 7) // 8)
+
+        bitmap = None
+        for column, values in filters.items():
+            if values is None:
+                continue
+            column_bitmap = self.column_bitmap(column, values, byte_range)
+            bitmap = column_bitmap if bitmap is None else bitmap & column_bitmap
+
+        if bitmap is None:
+            return None
+
+        rows = np.flatnonzero(np.unpackbits(bitmap)) + first_byte * 8
+        # The first and last byte can contain rows outside of the range
+        return rows[np.searchsorted(rows, start):np.searchsorted(rows, stop)]
+
+    def filter(self, df, filters, row_range=None):
+        # Rows of df matching the filters (within row_range), without filters df or a slice of it is returned
+        rows = self.select(filters, row_range)
+        if rows is None:
+            return df if row_range is None else df.iloc[row_range]
+        return df.iloc[rows]
+
+
+def filter_key(filters):
+    # Hashable version of a filter selection, used as cache key. The order of the selected values doesn't matter.
+    return tuple(sorted(
+        (column, None if values is None else tuple(sorted(values)))
+        for column, values in filters.items()
+    ))
@@ -1,26 +1,44 @@
 import streamlit as st
-import pandas as pd
-import customer_scenario
-import sales_scenario
-import market_scenario
-import profitability_scenario
-import product_scenario
+import data_loader
+import prepared_dataset
+import chunked_engine
+import sqlite_store
+import analytics
+import performance_trace
+import os
 import json
-import time
 import base64
 from streamlit_lottie import st_lottie
 
 st.set_page_config(page_title="Business Dashboard", page_icon="📊", layout="wide", initial_sidebar_state="expanded")
 
+# Files larger than the memory of the server can't be uploaded through the browser. If this directory is set, its
+# CSV files can be opened from the upload page in out-of-core mode instead.
+LARGE_FILES_DIR = os.environ.get("DASHBOARD_LARGE_FILES_DIR")
 
-# Load Lottie animation
+# Storage of uploaded files: "memory" keeps the prepared rows in memory, "sqlite" writes them to a local database
+# and pushes the filters of the scenarios down as SQL
+STORAGE_BACKEND = os.environ.get("DASHBOARD_STORAGE", "memory")
+
+
+# Load Lottie animation, parsed once per server process and shared by all sessions and reruns
+@st.cache_resource(show_spinner=False)
 def load_lottiefile(filepath: str):
     with open(filepath, 'r') as f:
         return json.load(f)
 
 
-# Polarbear Lotti animation
-lottie_polar_bear = load_lottiefile("polarbear.json")
+# Images of the overview cards are read and base64 encoded once per server process
+@st.cache_resource(show_spinner=False)
+def load_image_base64(image_path):
+    with open(image_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode()
+
+
+@st.cache_resource(show_spinner=False)
+def load_image(image_path):
+    with open(image_path, "rb") as image_file:
+        return image_file.read()
 
 # Initialize session state
 if 'view' not in st.session_state:
@@ -35,6 +53,18 @@ def switch_view(view_name):
 
 st.session_state.switch_view = switch_view  # Make switch_view function accessible from outside
 
+
+# Function to show a scenario view
+def show_scenario(scenario_logic):
+    try:
+        scenario_logic()
+    except chunked_engine.PartitionsRemovedError as e:
+        # The partitions of a large file were evicted from the disk while this session was still using it
+        st.error(f"{e}.")
+
+# Timing of this rerun, shown in the debug panel (?debug=1) and/or appended to the trace file
+performance_trace.start(st.session_state.view)
+
 if st.session_state.view == 'upload':  # Display the "Upload" view if the session state == "upload"
     # Centralization of "Welcome" text
     empty_col1, centered_col, empty_col2 = st.columns([1, 2, 1])
@@ -51,7 +81,8 @@ if st.session_state.view == 'upload':  # Display the "Upload" view if the sessio
     # Alignment of Polar Bear Lotti Animation
     empty_col1, col1, welcome_col, col2, empty_col2 = st.columns([1, 2, 0.01, 2, 1])
     with col1:
-        st_lottie(lottie_polar_bear, height=400, key="polar_bear")
+        # Polarbear Lotti animation
+        st_lottie(load_lottiefile("polarbear.json"), height=400, key="polar_bear")
 
     with col2:
         st.markdown("#### Start by uploading your data file")
@@ -60,28 +91,34 @@ if st.session_state.view == 'upload':  # Display the "Upload" view if the sessio
         st.write("2. Drag and drop the file into the area below or click 'Browse files' to select it.")
         st.write("3. Click 'Start Analysing' to analyse your data.")
 
-        # Define required columns as a constant variable
-        REQUIRED_COLUMNS = [
-            "Order Date", "Ship Date", "Ship Mode", "Customer Name", "Customer DOB", "Segment", "City", "State",
-            "Country",
-            "Postal Code", "Market", "Region", "Product ID", "Category", "Sub-Category", "Product Name", "Sales",
-            "Quantity", "Discount", "Profit", "Shipping Cost", "Order Priority", "Payment Method"
-        ]
-
         uploaded_csv = st.file_uploader("Drag and drop file here", type="csv")
 
+        large_csv = None
+        if LARGE_FILES_DIR:
+            large_csv = st.selectbox("Or open a large file from the server",
+                                     options=sorted(name for name in os.listdir(LARGE_FILES_DIR)
+                                                    if name.endswith(".csv")),
+                                     index=None)
+
 
         def load_csv(file):
             try:
-                df_check = pd.read_csv(file)
-
-                # Check if each required column is in file. If not, add it to this list.
-                missing_columns = [col for col in REQUIRED_COLUMNS if col not in df_check.columns]
+                # Check the header first, so an invalid file is rejected before the whole file is parsed
+                missing_columns = data_loader.find_missing_columns(data_loader.read_header(file))
                 if missing_columns:
                     st.error(f"Missing columns: {', '.join(missing_columns)}. Please check your CSV file.")
                     return None
+                elif STORAGE_BACKEND == "sqlite":
+                    return sqlite_store.load_sqlite_dataset(file)
                 else:
-                    return df_check
+                    # Types and derived columns are prepared once here instead of in every scenario.
+                    # Same file uploaded before (also before a restart) is loaded from the cache instead of parsed,
+                    # all sessions with the same file share one read-only dataset.
+                    return prepared_dataset.load_dataset(file)
+
+            except ValueError as e:
+                st.error(f"Your file can't be analysed: {e}. Please check your CSV file.")  # e.g. unknown date format
+                return None
 
             except Exception as e:
                 st.error("Something went wrong while uploading your file.")
@@ -89,14 +126,64 @@ if st.session_state.view == 'upload':  # Display the "Upload" view if the sessio
                 return None
 
 
-        if uploaded_csv is not None:
-            with st.spinner("Processing file..."):  # Spinner to symbolize processing of file
-                time.sleep(1)  # Add a delay for processing
-            df = load_csv(uploaded_csv)
-            if df is not None:
-                st.session_state.df = df  # Store dataframe in session state
+        def append_csvs(base_dataset, files):
+            try:
+                for file in files:
+                    missing_columns = data_loader.find_missing_columns(data_loader.read_header(file))
+                    if missing_columns:
+                        st.error(f"Missing columns in {file.name}: {', '.join(missing_columns)}. "
+                                 "Please check your CSV file.")
+                        return None
+                # Delta files (e.g. the orders of one day): only their rows are parsed and prepared,
+                # then they are appended to the base dataset all at once
+                return prepared_dataset.append_dataset(base_dataset, files)
+
+            except ValueError as e:
+                st.error(f"Your files can't be appended: {e}. Please check your CSV files.")
+                return None
+
+            except Exception as e:
+                st.error("Something went wrong while appending your files.")
+                print(f"Error appending CSV files: {e}")
+                return None
+
+
+        def load_large_csv(path):
+            try:
+                # The file is read in chunks and spilled to disk, the scenarios read the rows from there
+                return chunked_engine.load_large_dataset(path)
+
+            except ValueError as e:
+                st.error(f"Your file can't be analysed: {e}. Please check your CSV file.")
+                return None
+
+            except Exception as e:
+                st.error("Something went wrong while opening your file.")
+                print(f"Error loading large CSV file: {e}")
+                return None
+
+
+        if uploaded_csv is not None or large_csv is not None:
+            if uploaded_csv is not None:
+                with st.spinner("Processing file..."):  # Spinner is shown while the file is parsed
+                    dataset = load_csv(uploaded_csv)
+
+                if dataset is not None and not dataset.out_of_core:
+                    # Optional daily delta files, appended in the order they were uploaded
+                    delta_csvs = st.file_uploader("Append daily order files (optional)", type="csv",
+                                                  accept_multiple_files=True)
+                    if delta_csvs:
+                        with st.spinner(f"Appending {len(delta_csvs)} files..."):
+                            dataset = append_csvs(dataset, delta_csvs)
+            else:
+                with st.spinner("Processing file in chunks..."):
+                    dataset = load_large_csv(os.path.join(LARGE_FILES_DIR, large_csv))
+
+            if dataset is not None:
+                st.session_state.dataset = dataset  # Store prepared dataset in session state
+                analytics.warm_up(dataset)  # Default results of all scenarios are computed in the background
                 st.success("CSV file successfully uploaded!")
-                st.write(df)
+                st.write(dataset.df)  # Out-of-core datasets only keep the first rows in memory
                 if st.button("Start Analysing"):
                     switch_view('analysis')  # Call function to create "analysis" view and update view
             else:
@@ -152,9 +239,8 @@ elif st.session_state.view == 'analysis':  # Here we display the "Upload" view i
 
     # Function to create a card
     def create_card(image_path, title, description, bg_color, text_color):
-        # Read the image file and convert it to a base64 string
-        with open(image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode()
+        # Image file as base64 string, only read and converted on the first run
+        image_data = load_image_base64(image_path)
 
         st.markdown(f"""
             <div class="card" style="background-color: {bg_color}; border: 1px solid {bg_color}; padding: 10px; border-radius: 5px;">
@@ -176,7 +262,7 @@ elif st.session_state.view == 'analysis':  # Here we display the "Upload" view i
         st.markdown('<div class="container">', unsafe_allow_html=True)
 
     with col2:
-        st.image("assets/bar.png", width=200)
+        st.image(load_image("assets/bar.png"), width=200)
 
     # Create parallel sections
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -239,19 +325,25 @@ elif st.session_state.view == 'analysis':  # Here we display the "Upload" view i
 
 elif st.session_state.view == 'customer':  # Here we display the "Upload" view if the session state == "customer"
 
-    customer_scenario.customer_logic()  # Call customer logic method from CustomerScenario class
+    import customer_scenario  # Scenario modules (and their plotting libraries) are only imported when opened
+    show_scenario(customer_scenario.customer_logic)  # Call customer logic method from CustomerScenario class
 
 elif st.session_state.view == 'market':
 
-    market_scenario.market_logic()
+    import market_scenario
+    show_scenario(market_scenario.market_logic)
 
 elif st.session_state.view == 'sales':
 
-    sales_scenario.SalesScenario().sales_logic()
+    import sales_scenario
+    show_scenario(sales_scenario.SalesScenario().sales_logic)
 
 elif st.session_state.view == 'profit':
-    profitability_scenario.profit_logic()
+    import profitability_scenario
+    show_scenario(profitability_scenario.profit_logic)
 
 elif st.session_state.view == 'product':
-    product_scenario.ProductScenario().product_logic()
+    import product_scenario
+    show_scenario(product_scenario.ProductScenario().product_logic)
 
+performance_trace.finish()
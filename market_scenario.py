@@ -1,14 +1,15 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
+import analytics
+import performance_trace
 
 
 def market_logic():
     st.header("Welcome to the Market Analysis Section!")
     st.write("")
 
-    if st.session_state.df is not None:  # Checking if session state df is not empty
-        df = st.session_state.df  # Assigning session state df to variable "df"
+    if st.session_state.get('dataset') is not None:  # Checking if session state dataset is not empty
+        catalog = st.session_state.dataset.catalog  # Options of the filters, collected when loading the dataset
 
         # Sidebar with checkboxes for markets
         st.sidebar.header("Filter Options")
@@ -20,7 +21,7 @@ def market_logic():
             "The visualizations and data tables will dynamically update to reflect your selections.")
         st.sidebar.write("")
         # Create list of unique markets
-        market_list = df['Market'].unique().tolist()
+        market_list = catalog.options('Market')
 
         st.sidebar.markdown("#### Filter by relevant Market(s)")
         market = st.sidebar.multiselect(
@@ -29,12 +30,8 @@ def market_logic():
             default=market_list
         )
 
-        # Ensure the "Order Date" column is in datetime format
-        df['Order Date'] = pd.to_datetime(df['Order Date'])
-        df['Order Year'] = df['Order Date'].dt.year
-
         # Create list of unique years
-        years_list = df['Order Year'].unique().tolist()
+        years_list = catalog.options('Order Year')
 
         st.sidebar.markdown("#### Filter by relevant Year(s)")
         year_select = st.sidebar.multiselect(
@@ -43,11 +40,8 @@ def market_logic():
             default=years_list[-1]
         )
 
-        # Filter data using the selected markets and years
-        df_filtered_market = df.query("Market in @market and `Order Year` in @year_select")
-
-        # Filter the countries based on the selected markets
-        country_list = df_filtered_market["Country"].unique().tolist()
+        # Countries with orders in the selected markets and years
+        country_list = catalog.cascade_options('market', [market, year_select])
 
         st.sidebar.markdown("#### Filter by specific Countries")
         countries = st.sidebar.multiselect(
@@ -56,49 +50,52 @@ def market_logic():
             #default=country_list[0] if country_list else []
         )
 
-        df_filtered_countries = df_filtered_market.query("Country in @countries")
+        market_filters = {'Market': market, 'Order Year': year_select, 'Country': countries}
         country_str = ', '.join(countries)
 
+        # Summary of the selected market and the results of the selected countries in it
+        results = analytics.analyze('market', st.session_state.dataset, market_filters)
+        market_summary = results['market_summary']
+        country_results = results['countries']
+
         col1, col2 = st.columns(2)
 
-        if df_filtered_market.empty:
+        if market_summary.empty:
             st.warning("No market data available with current filter applied.", icon='⚠️')
         else:
             with col1:
-                sales_chart = alt.Chart(df_filtered_market).mark_bar().encode(
+                sales_chart = alt.Chart(market_summary).mark_bar().encode(
                     x=alt.X('Market:O', sort='-y', title='Market'),
-                    y=alt.Y('sum(Sales):Q', title='Total Sales'),
+                    y=alt.Y('Sales:Q', title='Total Sales'),
                     color='Market:N',
-                    tooltip=['Market', 'sum(Sales)']
+                    tooltip=['Market', 'Sales']
                 ).properties(
                     width=600,
                     height=400,
                     title='Total Sales by Market'
                 )
 
-                st.altair_chart(sales_chart, use_container_width=True)
+                performance_trace.altair_chart(sales_chart, use_container_width=True)
 
             with col2:
-                avg_sales_chart = alt.Chart(df_filtered_market).mark_bar().encode(
+                avg_sales_chart = alt.Chart(market_summary).mark_bar().encode(
                     x=alt.X('Market:O', sort='-y', title='Market'),
-                    y=alt.Y('mean(Sales):Q', title='Average Sales'),
+                    y=alt.Y('Sales Mean:Q', title='Average Sales'),
                     color='Market:N',
-                    tooltip=['Market', 'mean(Sales)']
+                    tooltip=['Market', 'Sales Mean']
                 ).properties(
                     width=600,
                     height=400,
                     title='Average Total Sales by Market'
                 )
 
-                st.altair_chart(avg_sales_chart, use_container_width=True)
+                performance_trace.altair_chart(avg_sales_chart, use_container_width=True)
 
-        if df_filtered_countries.empty:
+        if not country_results:
             st.info("Select a country to analyze the sales by product category for the selected country", icon='💡')
         else:
             for country in countries:
-                country_df = df_filtered_countries[df_filtered_countries['Country'] == country]
-
-                if country_df.empty:
+                if country not in country_results:
                     st.info(f"No data available for {country} with current filter applied.", icon='⚠️')
                 else:
                     st.subheader(f"Country specific analysis for _{country}_", divider="grey")
@@ -107,39 +104,37 @@ def market_logic():
 
                     with col3:
                         chart_title = f"Sales by Category for {country}"
-                        sales_category = alt.Chart(country_df).mark_bar().encode(
+                        category_sales = country_results[country]['category_sales']
+                        sales_category = alt.Chart(category_sales).mark_bar().encode(
                             x=alt.X('Category:O', sort='-y', title='Category'),
-                            y=alt.Y('sum(Sales):Q', title='Sales per Category'),
+                            y=alt.Y('Sales:Q', title='Sales per Category'),
                             color='Category:N',
-                            tooltip=['Category', 'sum(Sales)']
+                            tooltip=['Category', 'Sales']
                         ).properties(
                             width=600,
                             height=400,
                             title=chart_title
                         )
 
-                        st.altair_chart(sales_category, use_container_width=True)
+                        performance_trace.altair_chart(sales_category, use_container_width=True)
 
                     with col4:
                         chart_title_2 = f"Sales by Sub-Category for {country}"
-                        sales_sub_category = alt.Chart(country_df).mark_bar().encode(
+                        sub_category_sales = country_results[country]['sub_category_sales']
+                        sales_sub_category = alt.Chart(sub_category_sales).mark_bar().encode(
                             x=alt.X('Sub-Category:O', sort='-y', title='Sub-Category'),
-                            y=alt.Y('sum(Sales):Q', title='Sales per Sub-Category'),
+                            y=alt.Y('Sales:Q', title='Sales per Sub-Category'),
                             color='Sub-Category:N',
-                            tooltip=['Sub-Category', 'sum(Sales)']
+                            tooltip=['Sub-Category', 'Sales']
                         ).properties(
                             width=600,
                             height=400,
                             title=chart_title_2
                         )
 
-                        st.altair_chart(sales_sub_category, use_container_width=True)
-
-                    product_sales_summary = country_df.groupby('Product Name').agg({'Sales': 'sum'}).reset_index()
-
-                    sorted_prod_sum = product_sales_summary.sort_values(by="Sales", ascending=False)
+                        performance_trace.altair_chart(sales_sub_category, use_container_width=True)
 
-                    top_5_products = sorted_prod_sum.head(5)
+                    top_5_products = country_results[country]['top_products']
                     st.write(f"**Top Five Most Sold Products in {country}**")
                     st.write(top_5_products)
 
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import data_loader
+
+# Dimensions the filters and charts of the scenarios group by
+CUBE_DIMENSIONS = [
+    "Order Year", "Order Month", "Market", "Region", "Country", "Category", "Sub-Category", "Segment", "Gender",
+    "Payment Method"
+]
+
+# Measures that are aggregated for every combination of dimension values
+CUBE_MEASURES = ["Sales", "Profit", "Discount", "Shipping Cost"]
+
+
+class OlapCube:
+    # Pre-aggregated version of the dataset. Every cell holds the sum, sum of squares and row count of the measures
+    # for one combination of dimension values. These are additive, so any filter and grouping can be rolled up from
+    # the cells without going back to the rows.
+    def __init__(self, df):
+        self.dimensions = [dim for dim in CUBE_DIMENSIONS if dim in df.columns]  # Gender is an optional column
+        self.measures = CUBE_MEASURES
+
+        # Sums are accumulated in float64, also for measures stored in a smaller type (Discount)
+        measures = df[self.measures].astype("float64")
+        squares = measures.pow(2).add_suffix(" Squares")
+        values = pd.concat([df[self.dimensions], measures, squares], axis=1)
+        values["Count"] = 1
+
+        self.cells = values.groupby(self.dimensions, observed=True, dropna=False).sum().reset_index()
+
+    def append(self, df_new):
+        # New cube with the rows of df_new added. Only the new rows are aggregated, their cells are then merged with
+        # the existing cells (all measures are additive), so the cost depends on the new rows and not the history.
+        new_cube = OlapCube(df_new[self.dimensions + self.measures])
+        cells = data_loader.concat_rows(self.cells, new_cube.cells)
+
+        cube = OlapCube.__new__(OlapCube)
+        cube.dimensions = self.dimensions
+        cube.measures = self.measures
+        cube.cells = cells.groupby(self.dimensions, observed=True, dropna=False).sum().reset_index()
+        return cube
+
+    def filter_cells(self, filters=None):
+        # filters maps a dimension to the selected values, None means the dimension is not filtered
+        if not filters:
+            return self.cells
+
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dimension, values in filters.items():
+            if values is not None:
+                mask &= self.cells[dimension].isin(values).to_numpy()
+
+        return self.cells[mask]
+
+    def roll_up(self, by, filters=None):
+        # Returns sum ("Sales"), mean ("Sales Mean") and standard deviation ("Sales Std") of every measure per group
+        return self.aggregate(self.filter_cells(filters), by)
+
+    def roll_up_many(self, groupings, filters=None):
+        # Several roll-ups with the same filters, the cells are only filtered once
+        cells = self.filter_cells(filters)
+        return [self.aggregate(cells, by) for by in groupings]
+
+    def aggregate(self, cells, by):
+        by = [by] if isinstance(by, str) else list(by)
+        squares = [f"{measure} Squares" for measure in self.measures]
+
+        result = cells.groupby(by, observed=True)[self.measures + squares + ["Count"]].sum()
+
+        for measure in self.measures:
+            mean = result[measure] / result["Count"]
+            # Sample variance (like pandas std), not defined for groups with a single row
+            variance = (result[f"{measure} Squares"] - result[measure] * mean) / (result["Count"] - 1)
+            result[f"{measure} Mean"] = mean
+            result[f"{measure} Std"] = np.sqrt(variance.clip(lower=0).where(result["Count"] > 1))
+
+        return result.drop(columns=squares).reset_index()
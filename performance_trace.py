@@ -0,0 +1,132 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+import result_cache
+
+# Timing of the steps of a rerun (load, prepare, filter, aggregate, chart-build, render) with row counts and payload
+# sizes. A trace is only collected if the debug panel is open (?debug=1 in the URL) or a trace file is set, otherwise
+# the spans don't record anything.
+
+# Every rerun is appended to this file as one JSON line, e.g. DASHBOARD_TRACE_FILE=traces.jsonl
+TRACE_FILE = os.environ.get("DASHBOARD_TRACE_FILE")
+
+# Trace of the rerun running in the current thread (every session runs its script in its own thread)
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+# Reruns of different sessions append to the same file
+file_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, view):
+        self.view = view
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+
+    def to_dict(self):
+        return {"timestamp": self.timestamp, "view": self.view, "seconds": self.seconds, "spans": self.spans}
+
+
+def debug_enabled():
+    return st.query_params.get("debug") == "1"
+
+
+def start(view):
+    # Starts the trace of a rerun, replaces the trace of the previous rerun of this session
+    trace = Trace(view) if TRACE_FILE or debug_enabled() else None
+    current_trace.set(trace)
+    return trace
+
+
+@contextmanager
+def span(name, **fields):
+    # Times the block as one step of the current rerun. More fields (e.g. the number of rows) can be added to the
+    # yielded dict inside the block.
+    trace = current_trace.get()
+    if trace is None:
+        yield {}
+        return
+
+    record = {"name": name, **fields}
+    start_time = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["start"] = start_time - trace.start
+        record["seconds"] = time.perf_counter() - start_time
+        trace.spans.append(record)
+
+
+def altair_chart(chart, **kwargs):
+    # st.altair_chart with the spec building and the rendering as separate spans. The spec is only built
+    # separately (to get its size) while tracing, Streamlit builds it again when the chart is rendered.
+    if current_trace.get() is not None:
+        with span("chart-build") as record:
+            record["bytes"] = len(chart.to_json())
+    with span("render", element="altair_chart"):
+        st.altair_chart(chart, **kwargs)
+
+
+def image(image_data, **kwargs):
+    with span("render", element="image", bytes=len(image_data)):
+        st.image(image_data, **kwargs)
+
+
+def finish():
+    # Ends the trace of the rerun, appends it to the trace file and shows it in the debug panel
+    trace = current_trace.get()
+    if trace is None:
+        return
+    current_trace.set(None)
+    trace.seconds = time.perf_counter() - trace.start
+
+    if TRACE_FILE:
+        with file_lock, open(TRACE_FILE, "a") as f:
+            f.write(json.dumps(trace.to_dict(), default=str) + "\n")
+
+    if debug_enabled():
+        show_panel(trace)
+
+
+def show_panel(trace):
+    with st.sidebar.expander("Performance", expanded=True):
+        st.write(f"**{trace.view}** rerun: {trace.seconds * 1000:.1f} ms")
+        if trace.spans:
+            spans = pd.DataFrame(trace.spans).sort_values("start")
+            spans["ms"] = spans["seconds"] * 1000
+            st.dataframe(spans.drop(columns=["start", "seconds"]), hide_index=True)
+
+        # Counters of the result cache since the server was started
+        stats = result_cache.results.stats()
+        st.write(f"Result cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+                 f"{stats['entries']} results in {stats['bytes'] / 2 ** 20:.1f} MB")
+
+
+def summarize(path):
+    # Latency percentiles per view and step of all traces in a trace file
+    steps = []
+    with open(path) as f:
+        for line in f:
+            trace = json.loads(line)
+            # Steps that ran several times in a rerun (e.g. one render per chart) are added up
+            step_seconds = {"total": trace["seconds"]}
+            for record in trace["spans"]:
+                step_seconds[record["name"]] = step_seconds.get(record["name"], 0) + record["seconds"]
+            steps += [{"view": trace["view"], "step": step, "seconds": seconds}
+                      for step, seconds in step_seconds.items()]
+
+    summary = pd.DataFrame(steps).groupby(["view", "step"])["seconds"].describe(percentiles=[0.5, 0.9, 0.99])
+    return summary[["count", "50%", "90%", "99%", "max"]]
+
+
+if __name__ == "__main__":
+    # python performance_trace.py traces.jsonl
+    print(summarize(sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE).to_string())
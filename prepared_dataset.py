@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+import data_loader
+import dataset_cache
+import column_catalog
+import filter_engine
+import olap_cube
+import performance_trace
+
+
+# Customers without a date of birth (corporate customers) get this age
+MISSING_DOB_AGE = 0
+
+
+def calculate_age(dob, current_date=None):
+    # Calculate the current date
+    if current_date is None:
+        current_date = pd.Timestamp.today()
+
+    # Age in years, minus one if the birthday has not been reached yet this year.
+    # Calculated on the whole column at once instead of row by row.
+    birthday_not_reached = ((dob.dt.month > current_date.month)
+                            | ((dob.dt.month == current_date.month) & (dob.dt.day > current_date.day)))
+    age = current_date.year - dob.dt.year - birthday_not_reached.astype(int)
+
+    # Missing date of birth gives a missing age, which is set to MISSING_DOB_AGE explicitly
+    return age.fillna(MISSING_DOB_AGE).astype(int)
+
+
+class PreparedDataset:
+    # Holds the uploaded data with the final dtypes and all derived columns the scenarios need.
+    # It is built once after the upload, the scenarios only read from it and never change the frame.
+    out_of_core = False  # All rows are in memory, see chunked_engine and sqlite_store for the other cases
+
+    def __init__(self, df, version=None):
+        self.version = version  # Hash of the uploaded file, identifies this dataset
+        self.df = self.prepare(df)
+        self.order_dates = self.df['Order Date'].to_numpy()  # Sorted, used for binary search on date ranges
+        self.cube = olap_cube.OlapCube(self.df)  # Pre-aggregated measures the scenario charts roll up from
+        self.index = filter_engine.BitmapIndex(self.df)  # Bitmaps for the filters of the scenarios
+        self.catalog = column_catalog.ColumnCatalog(self.df)  # Options and slider bounds of the sidebars
+
+    @classmethod
+    def from_parts(cls, df, version, cube, index, catalog):
+        # Dataset from an already prepared frame and the cube and index built for it
+        dataset = cls.__new__(cls)
+        dataset.version = version
+        dataset.df = df
+        dataset.order_dates = df['Order Date'].to_numpy()
+        dataset.cube = cube
+        dataset.index = index
+        dataset.catalog = catalog
+        return dataset
+
+    @staticmethod
+    def prepare(df):
+        # Rows without a valid order date can't be shown in any scenario.
+        # Rows are sorted by order date, so every year or date range is one contiguous block of rows.
+        df = df.dropna(subset=['Order Date']).sort_values('Order Date', kind='stable').reset_index(drop=True)
+
+        df['Order Year'] = df['Order Date'].dt.year
+        df['Order Month'] = df['Order Date'].dt.to_period('M').dt.to_timestamp()
+        df['Age'] = calculate_age(df['Customer DOB'])
+        df['Ship Days'] = (df['Ship Date'] - df['Order Date']).dt.days
+
+        return df
+
+    def align(self, df_new):
+        # Prepares the rows of a new file and gives them the columns of this dataset. Columns missing in the new file
+        # (e.g. the optional Gender) are added as missing values of the column type of this dataset, filled with
+        # float NaN they couldn't be combined with its categorical columns.
+        df_new = self.prepare(df_new)
+        df_new = df_new.assign(**{column: pd.Series(index=df_new.index, dtype=self.df[column].dtype)
+                                  for column in self.df.columns if column not in df_new.columns})
+        return df_new[self.df.columns]
+
+    def append(self, new_frames, version):
+        # New dataset with the rows of all frames in new_frames (e.g. the orders of some days) added in one step.
+        # This dataset is not changed, it can still be used by other sessions. Derived columns, cube and index are
+        # only built for the new rows.
+        parts = [self.align(df_new) for df_new in new_frames]
+        df_new = parts[0]
+        for part in parts[1:]:
+            df_new = data_loader.concat_rows(df_new, part)
+        if len(parts) > 1:
+            df_new = df_new.sort_values('Order Date', kind='stable').reset_index(drop=True)
+        df = data_loader.concat_rows(self.df, df_new)
+
+        if not df_new.empty and not self.df.empty and df_new['Order Date'].iloc[0] < self.order_dates[-1]:
+            # New rows with older order dates would break the sort order, the whole dataset is prepared again
+            return PreparedDataset(df, version)
+
+        return PreparedDataset.from_parts(df, version, self.cube.append(df_new), self.index.append(df_new),
+                                          self.catalog.append(df_new))
+
+    def date_range_rows(self, start_date, end_date):
+        # Row positions with start_date <= Order Date <= end_date, found by binary search on the sorted dates
+        first = np.searchsorted(self.order_dates, np.datetime64(pd.Timestamp(start_date)), side='left')
+        last = np.searchsorted(self.order_dates, np.datetime64(pd.Timestamp(end_date)), side='right')
+        return slice(int(first), int(last))
+
+
+class DatasetView:
+    # Per session view on a shared PreparedDataset. The session only keeps a reference to the shared dataset,
+    # all derived columns the scenarios need are in the shared frame.
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __getattr__(self, name):
+        # Everything (df, version, cube, index, ...) is read from the shared dataset
+        return getattr(self.dataset, name)
+
+
+# Max number of different datasets kept in memory for all sessions together
+MAX_SHARED_DATASETS = 5
+
+
+@st.cache_resource(max_entries=MAX_SHARED_DATASETS, show_spinner=False)
+def get_shared_dataset(version, _build_dataset):
+    # One prepared dataset per file content for the whole server process, every session uploading the same
+    # file gets the same object. _build_dataset is only called if the dataset is not in memory yet.
+    return _build_dataset()
+
+
+def read_dataset(file, version, store=True):
+    # Load from the file cache if the same file was parsed before, otherwise parse it (and store it if store is set)
+    with performance_trace.span('load') as record:
+        df = dataset_cache.load(version)
+        record['source'] = 'cache'
+        if df is None:
+            df = data_loader.read_superstore_csv(file)
+            if store:
+                dataset_cache.store(version, df)
+            record['source'] = 'csv'
+        record['rows'] = len(df)
+    return df
+
+
+def prepare_dataset(df, version):
+    if df['Order Date'].isna().all():  # Also if there are no rows at all
+        raise ValueError("the file doesn't contain any orders")
+    with performance_trace.span('prepare', rows=len(df)):
+        return PreparedDataset(df, version)
+
+
+def load_dataset(file):
+    version = dataset_cache.content_hash(file.getvalue())
+    shared_dataset = get_shared_dataset(version, lambda: prepare_dataset(read_dataset(file, version), version))
+    return DatasetView(shared_dataset)
+
+
+def append_rows(dataset, files, version):
+    with performance_trace.span('load', source='delta') as record:
+        new_frames = [data_loader.read_superstore_csv(file) for file in files]
+        record['rows'] = sum(map(len, new_frames))
+    with performance_trace.span('prepare', rows=record['rows']):
+        return dataset.append(new_frames, version)
+
+
+def append_dataset(dataset_view, files):
+    # The appended dataset is identified by the version of the dataset it is based on and the contents of the files
+    # in their order. Only the dataset with all files appended is shared, the steps in between would each hold a
+    # full copy of the rows in the shared datasets.
+    file_versions = [dataset_cache.content_hash(file.getvalue()) for file in files]
+    version = dataset_cache.content_hash(f"{dataset_view.version}{''.join(file_versions)}".encode())
+    shared_dataset = get_shared_dataset(version, lambda: append_rows(dataset_view.dataset, files, version))
+    return DatasetView(shared_dataset)
@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
+import analytics
+import performance_trace
 
 
 class ProductScenario:
@@ -11,20 +12,8 @@ class ProductScenario:
         st.header("Welcome to the Product Analysis Section!")
         st.write("")
         # Error handling, because data might be empty
-        if 'df' in st.session_state and st.session_state.df is not None:  # Checking if session state df is not empty
-            df = st.session_state.df  # Assigning session state df to variable "df"
-
-            # Ensure numeric columns are of correct type
-            df['Sales'] = pd.to_numeric(df['Sales'], errors='coerce')
-            df['Profit'] = pd.to_numeric(df['Profit'], errors='coerce')
-            df['Discount'] = pd.to_numeric(df['Discount'], errors='coerce')
-            df['Shipping Cost'] = pd.to_numeric(df['Shipping Cost'], errors='coerce')
-
-            # Ensure 'Order Date' is datetime
-            df['Order Date'] = pd.to_datetime(df['Order Date'], format='%d %m %Y', errors='coerce')
-
-            # Remove rows with missing Order Dates
-            df = df.dropna(subset=['Order Date'])
+        if st.session_state.get('dataset') is not None:  # Checking if session state dataset is not empty
+            catalog = st.session_state.dataset.catalog  # Options of the filters, collected when loading the dataset
 
             # Sidebar for Product Category Filter
             with st.sidebar:
@@ -36,35 +25,34 @@ class ProductScenario:
                 st.write("")
 
                 st.markdown("#### Filter by Product Category")
-                categories = df['Category'].unique()
+                categories = catalog.options('Category')
                 selected_category = st.multiselect("Select Category", categories)
 
-                # Filter DataFrame by selected categories before showing sub-categories
-                if selected_category:
-                    df = df[df['Category'].isin(selected_category)]
+                # Filters without a selection are not applied
+                product_filters = {'Category': selected_category or None}
 
+                # Only the sub-categories of the selected categories are shown
                 st.markdown("#### Filter by Sub-Category")
-                sub_categories = df['Sub-Category'].unique()
+                sub_categories = catalog.cascade_options('product', [product_filters['Category']])
                 selected_sub_category = st.multiselect("Select Sub-Category", sub_categories)
+                product_filters['Sub-Category'] = selected_sub_category or None
 
-                # Filter DataFrame by selected sub-categories before showing years
-                if selected_sub_category:
-                    df = df[df['Sub-Category'].isin(selected_sub_category)]
-
+                # Only the years with orders of the selected categories and sub-categories are shown
                 st.markdown("#### Filter by relevant Year(s)")
-                df['Order Year'] = df['Order Date'].dt.year
-                unique_years = df['Order Year'].dropna().unique()
+                unique_years = catalog.cascade_options('product', [product_filters['Category'],
+                                                                   product_filters['Sub-Category']])
                 year_select = st.sidebar.multiselect('Select Year(s)', options=unique_years)
+                product_filters['Order Year'] = year_select or None
 
-                if year_select:
-                    df = df[df['Order Year'].isin(year_select)]
+            # Results of all panels, computed together in one step
+            summaries = analytics.analyze('product', st.session_state.dataset, product_filters)
+            # Results come from the shared result cache, frames that get more columns for the charts are copied
+            top_selling = summaries['top_selling'].copy()
+            least_selling = summaries['least_selling'].copy()
 
-            # Top-Selling Products & Least-Selling Products
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("Top-Selling Products:+1:")
-                top_selling = df.groupby('Product Name').sum(numeric_only=True)['Sales'].sort_values(
-                    ascending=False).head(10).reset_index()
                 if not top_selling.empty:
                     top_selling['Rank'] = top_selling['Sales'].rank(method='first', ascending=False)
                     chart = alt.Chart(top_selling).mark_bar().encode(
@@ -77,14 +65,12 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Top-Selling Products.")
 
             with col2:
                 st.subheader("Least-Selling Products:-1:")
-                least_selling = df.groupby('Product Name').sum(numeric_only=True)['Sales'].sort_values().head(
-                    10).reset_index()
                 if not least_selling.empty:
                     least_selling['Rank'] = least_selling['Sales'].rank(method='first', ascending=True)
                     chart = alt.Chart(least_selling).mark_bar().encode(
@@ -97,15 +83,14 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Least-Selling Products.")
 
             # Sales Trends Over Time
             st.subheader("Sales Trends Over Time")
-            sales_trends = df.resample('ME', on='Order Date').sum(numeric_only=True)['Sales'].reset_index()
+            sales_trends = summaries['sales_trends']
             if not sales_trends.empty:
-                sales_trends['Order Date'] = pd.to_datetime(sales_trends['Order Date'])
                 brush = alt.selection_interval(encodings=['x'])
 
                 base = alt.Chart(sales_trends).mark_line(point=True).encode(
@@ -121,7 +106,7 @@ class ProductScenario:
 
                 trendline = (base.transform_regression('Order Date', 'Sales')
                              .mark_line(color='red', strokeDash=[5, 5]))
-                st.altair_chart(base + trendline)
+                performance_trace.altair_chart(base + trendline)
             else:
                 st.write("No data available for Sales Trends Over Time.")
 
@@ -129,8 +114,7 @@ class ProductScenario:
             col3, col4 = st.columns(2)
             with col3:
                 st.subheader("Sales by Product Category")
-                sales_by_category = df.groupby('Category').sum(numeric_only=True)['Sales'].sort_values(
-                    ascending=False).reset_index()
+                sales_by_category = summaries['sales_by_category'].copy()
                 if not sales_by_category.empty:
                     sales_by_category['Percentage'] = sales_by_category['Sales'] / sales_by_category[
                         'Sales'].sum() * 100
@@ -144,14 +128,13 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Sales by Product Category.")
 
             with col4:
                 st.subheader("Sales by Sub-Category")
-                sales_by_sub_category = df.groupby('Sub-Category').sum(numeric_only=True)['Sales'].sort_values(
-                    ascending=False).reset_index()
+                sales_by_sub_category = summaries['sales_by_sub_category']
                 if not sales_by_sub_category.empty:
                     chart = alt.Chart(sales_by_sub_category).mark_bar().encode(
                         x=alt.X('Sales:Q', title='Sales'),
@@ -161,7 +144,7 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Sales by Sub-Category.")
 
@@ -169,8 +152,7 @@ class ProductScenario:
             col5, col6 = st.columns(2)
             with col5:
                 st.subheader("Profit by Product Category")
-                profit_by_category = df.groupby('Category').sum(numeric_only=True)['Profit'].sort_values(
-                    ascending=False).reset_index()
+                profit_by_category = summaries['profit_by_category'].copy()
                 if not profit_by_category.empty:
                     profit_by_category['Percentage'] = profit_by_category['Profit'] / profit_by_category[
                         'Profit'].sum() * 100
@@ -184,14 +166,13 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Profit by Product Category.")
 
             with col6:
                 st.subheader("Profit by Sub-Category")
-                profit_by_sub_category = df.groupby('Sub-Category').sum(numeric_only=True)['Profit'].sort_values(
-                    ascending=False).reset_index()
+                profit_by_sub_category = summaries['profit_by_sub_category']
                 if not profit_by_sub_category.empty:
                     chart = alt.Chart(profit_by_sub_category).mark_bar().encode(
                         x=alt.X('Profit:Q', title='Profit'),
@@ -201,7 +182,7 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Profit by Sub-Category.")
 
@@ -209,8 +190,7 @@ class ProductScenario:
             col7, col8 = st.columns(2)
             with col7:
                 st.subheader("Average Discount by Category")
-                avg_discount_by_category = df.groupby('Category').mean(numeric_only=True)['Discount'].sort_values(
-                    ascending=False).reset_index()
+                avg_discount_by_category = summaries['avg_discount_by_category'].copy()
                 if not avg_discount_by_category.empty:
                     avg_discount_by_category['Percentage'] = avg_discount_by_category['Discount'] / \
                                                              avg_discount_by_category['Discount'].sum() * 100
@@ -225,13 +205,13 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Average Discount by Category.")
 
             with col8:
                 st.subheader("Average Discount by Sub-Category")
-                avg_discount_by_sub_category = df.groupby('Sub-Category').mean(numeric_only=True)['Discount'].sort_values(ascending=False).reset_index()
+                avg_discount_by_sub_category = summaries['avg_discount_by_sub_category']
                 if not avg_discount_by_sub_category.empty:
                     chart = alt.Chart(avg_discount_by_sub_category).mark_bar().encode(
                         x=alt.X('Discount:Q', title='Average Discount'),
@@ -241,7 +221,7 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Average Discount by Sub-Category.")
 
@@ -249,7 +229,7 @@ class ProductScenario:
             col9, col10 = st.columns(2)
             with col9:
                 st.subheader("Shipping Cost Analysis by Category")
-                shipping_cost_by_category = df.groupby('Category').mean(numeric_only=True)['Shipping Cost'].sort_values(ascending=False).reset_index()
+                shipping_cost_by_category = summaries['shipping_cost_by_category'].copy()
                 if not shipping_cost_by_category.empty:
                     shipping_cost_by_category['Percentage'] = shipping_cost_by_category['Shipping Cost'] / shipping_cost_by_category['Shipping Cost'].sum() * 100
                     shipping_cost_by_category['Category'] = shipping_cost_by_category['Category'].astype(str)
@@ -262,13 +242,13 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Shipping Cost by Category.")
 
             with col10:
                 st.subheader("Shipping Cost Analysis by Sub-Category")
-                shipping_cost_by_sub_category = df.groupby('Sub-Category').mean(numeric_only=True)['Shipping Cost'].sort_values(ascending=False).reset_index()
+                shipping_cost_by_sub_category = summaries['shipping_cost_by_sub_category']
                 if not shipping_cost_by_sub_category.empty:
                     chart = alt.Chart(shipping_cost_by_sub_category).mark_bar().encode(
                         x=alt.X('Shipping Cost:Q', title='Shipping Cost'),
@@ -278,7 +258,7 @@ class ProductScenario:
                         width=350,
                         height=400
                     )
-                    st.altair_chart(chart)
+                    performance_trace.altair_chart(chart)
                 else:
                     st.write("No data available for Shipping Cost by Sub-Category.")
 
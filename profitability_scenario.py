@@ -1,22 +1,21 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
+import prepared_dataset
+import analytics
+import performance_trace
 
 
 def profit_logic():
     st.header("Welcome to the Profitability Analysis Section!")
     st.write("")
 
-    if st.session_state.df is not None:  # Checking if session state df is not empty
-        df = st.session_state.df  # Assigning session state df to variable "df"
+    if st.session_state.get('dataset') is not None:  # Checking if session state dataset is not empty
+        dataset = st.session_state.dataset
+        catalog = dataset.catalog  # Options and bounds of the filters, collected when loading the dataset
 
-        # Convert "Order Date" column to datetime
-        df["Order Date"] = pd.to_datetime(df["Order Date"])
-
-        # Extract unique years from "Order Date" column and convert to list
-        order_years_list = df["Order Date"].dt.year.unique().tolist()
-        # Extract unique product categories from "Category" column and convert to list
-        category_list = df["Category"].unique().tolist()
+        # Sorted lists of the order years (latest year is the default) and product categories
+        order_years_list = catalog.options("Order Year")
+        category_list = catalog.options("Category")
 
         # Sidebar for Profit Scenario
         with st.sidebar:
@@ -41,16 +40,15 @@ def profit_logic():
             )
 
             if selected_years:
-                df_filtered_by_year = df[df["Order Date"].dt.year.isin(selected_years)]
-                # Extract unique dates from "Order Date" column and convert to list
-                order_dates_list = df_filtered_by_year["Order Date"].dt.date.unique().tolist()
+                # First and last order date of the selected years
+                min_date, max_date = catalog.date_bounds(selected_years)
 
                 st.markdown("#### Filter by Order Date Range")
                 date_range = st.slider(
                     "Select Order Date Range",
-                    min_value=min(order_dates_list),
-                    max_value=max(order_dates_list),
-                    value=(min(order_dates_list), max(order_dates_list)),
+                    min_value=min_date,
+                    max_value=max_date,
+                    value=(min_date, max_date),
                     format="YYYY-MM-DD"
                 )
 
@@ -60,28 +58,23 @@ def profit_logic():
                 st.session_state.switch_view('analysis')
 
         if selected_years:
-            df_filtered_by_year = df[df["Order Date"].dt.year.isin(selected_years)]
-
-            filtered_df = df_filtered_by_year.query(
-                "`Order Date` >= @pd.Timestamp(@date_range[0]) and `Order Date` <= @pd.Timestamp(@date_range[1]) "
-                "and `Category` in @selected_categories"
-            )
+            # Metrics and tables of the profitability analysis for the selected categories, years and date range
+            profit_filters = {'Order Year': selected_years, 'Category': selected_categories,
+                              'Order Date': date_range}
+            results = analytics.analyze('profit', dataset, profit_filters)
 
             # Display warning if df empty
-            if filtered_df.empty:
+            if results['rows'] == 0:
                 st.warning("No profitability data available with current filter applied.", icon='⚠️')
             else:
                 # Display the profitability overview
                 st.subheader("Profitability Overview")
 
-                # Calculate total profit and profit margin
-                total_profit = filtered_df['Profit'].sum()
-                total_sales = filtered_df['Sales'].sum()
-                profit_margin = (total_profit / total_sales) * 100
-
-                # Calculate expected profit for comparison
-                expected_profit = 0.15 * total_sales  # We assume  15% of total sales as expected profit
-                profit_diff = total_profit - expected_profit
+                # Total profit and profit margin, compared with the expected profit
+                total_profit = results['total_profit']
+                profit_margin = results['profit_margin']
+                expected_profit = results['expected_profit']
+                profit_diff = results['profit_diff']
 
                 if profit_diff < 0:
                     st.toast("Warning: Actual profit is less than expected profit for selected period.", icon="🚨")
@@ -98,8 +91,7 @@ def profit_logic():
                     st.metric("Profit Difference", f"${profit_diff:.2f}")
                 st.write("")
                 # Monthly Profit Trend
-                monthly_profit_trend = filtered_df.groupby(pd.Grouper(key='Order Date', freq='ME')).agg(
-                    {'Profit': 'sum'}).reset_index()
+                monthly_profit_trend = results['monthly_profit_trend']
                 monthly_profit_trend_chart = alt.Chart(monthly_profit_trend).mark_line(point=True).encode(
                     x=alt.X('yearmonth(Order Date):T', title='Month'),
                     y=alt.Y('Profit:Q', title='Total Profit'),
@@ -117,17 +109,13 @@ def profit_logic():
                     strokeOpacity=0
                 )
 
-                st.altair_chart(monthly_profit_trend_chart, use_container_width=True)
+                performance_trace.altair_chart(monthly_profit_trend_chart, use_container_width=True)
 
-                # Group by market, country, category, sub-category, and customer to calculate total profit
-                market_profit = (filtered_df.groupby('Market').agg({'Profit': 'sum'}).reset_index()
-                                 .sort_values(by='Profit', ascending=False).head(5))
-                country_profit = (filtered_df.groupby('Country').agg({'Profit': 'sum'}).reset_index()
-                                  .sort_values(by='Profit', ascending=False).head(5))
-                category_profit = (filtered_df.groupby('Category').agg({'Profit': 'sum'}).reset_index()
-                                   .sort_values(by='Profit', ascending=False).head(3))
-                sub_category_profit = (filtered_df.groupby('Sub-Category').agg({'Profit': 'sum'}).reset_index()
-                                       .sort_values(by='Profit', ascending=False).head(5))
+                # Total profit per market, country, category and sub-category
+                market_profit = results['market_profit']
+                country_profit = results['country_profit']
+                category_profit = results['category_profit']
+                sub_category_profit = results['sub_category_profit']
 
                 # Display top 5 profitable markets, countries, categories, sub-categories, and customers
                 col1, col2 = st.columns(2)
@@ -170,7 +158,7 @@ def profit_logic():
                     strokeOpacity=0
                 )
 
-                st.altair_chart(profit_by_market_chart, use_container_width=True)
+                performance_trace.altair_chart(profit_by_market_chart, use_container_width=True)
 
                 # Profit by Country
                 profit_by_country_chart = alt.Chart(country_profit).mark_bar().encode(
@@ -191,7 +179,7 @@ def profit_logic():
                     strokeOpacity=0
                 )
 
-                st.altair_chart(profit_by_country_chart, use_container_width=True)
+                performance_trace.altair_chart(profit_by_country_chart, use_container_width=True)
 
                 # Profit by Category
                 profit_by_category_chart = alt.Chart(category_profit).mark_bar().encode(
@@ -212,7 +200,7 @@ def profit_logic():
                     strokeOpacity=0
                 )
 
-                st.altair_chart(profit_by_category_chart, use_container_width=True)
+                performance_trace.altair_chart(profit_by_category_chart, use_container_width=True)
 
                 # Profit by Sub-Category
                 profit_by_sub_category_chart = alt.Chart(sub_category_profit).mark_bar().encode(
@@ -233,7 +221,7 @@ def profit_logic():
                     strokeOpacity=0
                 )
 
-                st.altair_chart(profit_by_sub_category_chart, use_container_width=True)
+                performance_trace.altair_chart(profit_by_sub_category_chart, use_container_width=True)
 
 
         else:
@@ -244,7 +232,7 @@ def profit_logic():
         uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
         if uploaded_file is not None:
             try:
-                st.session_state.df = pd.read_csv(uploaded_file)
+                st.session_state.dataset = prepared_dataset.load_dataset(uploaded_file)
                 st.success("File uploaded successfully!")
             except Exception as e:
                 st.error(f"Error uploading file: {e}")
@@ -0,0 +1,18 @@
+import numpy as np
+
+
+def top_bottom(totals, measure, k):
+    # Returns the k rows with the highest (sorted descending) and the k rows with the lowest (sorted ascending)
+    # value of measure. argpartition only separates the k rows from the rest, only those k rows are sorted.
+    values = totals[measure].to_numpy()
+
+    if len(values) > k:
+        top = np.argpartition(-values, k - 1)[:k]
+        bottom = np.argpartition(values, k - 1)[:k]
+    else:
+        top = bottom = np.arange(len(values))
+
+    top = top[np.argsort(-values[top], kind='stable')]
+    bottom = bottom[np.argsort(values[bottom], kind='stable')]
+
+    return totals.iloc[top], totals.iloc[bottom]
@@ -0,0 +1,75 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Results of the scenarios for every dataset version and filter state, shared by all sessions of the server process.
+# Going back to a view or to a filter selection that was shown before reads the result from here instead of
+# filtering and aggregating again. The cache has a memory budget, the least recently used results are removed first.
+
+# Memory budget of the cache in MB, e.g. DASHBOARD_RESULT_CACHE_MB=512
+MAX_RESULT_BYTES = int(os.environ.get("DASHBOARD_RESULT_CACHE_MB", "256")) * 1024 ** 2
+
+
+def result_bytes(value):
+    # Memory of a result: the frames it contains and the containers holding them
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_bytes(key) + result_bytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    # LRU cache with a limit on the memory of the stored results instead of their number. Results are returned as
+    # they are (not copied), the callers must not change them.
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (result, bytes), least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()  # Sessions and warm-up threads use the cache at the same time
+
+    def get(self, key):
+        # Result stored for key, or None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        size = result_bytes(result)
+        if size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+
+        with self.lock:
+            old_entry = self.entries.pop(key, None)  # Computed by two sessions at the same time
+            if old_entry is not None:
+                self.bytes -= old_entry[1]
+            self.entries[key] = (result, size)
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self.entries), "bytes": self.bytes}
+
+
+# Cache of the scenario results of this server process
+results = ResultCache(MAX_RESULT_BYTES)
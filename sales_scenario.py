@@ -1,6 +1,8 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
+import prepared_dataset
+import analytics
+import performance_trace
 
 
 class SalesScenario:
@@ -12,16 +14,13 @@ class SalesScenario:
         st.write("")
 
 
-        if st.session_state.df is not None:  # Checking if session state df is not empty
-            df = st.session_state.df  # Assigning session state df to variable "df"
+        if st.session_state.get('dataset') is not None:  # Checking if session state dataset is not empty
+            dataset = st.session_state.dataset
+            catalog = dataset.catalog  # Options and bounds of the filters, collected when loading the dataset
 
-            # Convert "Order Date" column to datetime
-            df["Order Date"] = pd.to_datetime(df["Order Date"])
-
-            # Extract unique years from "Order Date" column and convert to list
-            order_years_list = df["Order Date"].dt.year.unique().tolist()
-            # Extract unique product categories from "Category" column and convert to list
-            category_list = df["Category"].unique().tolist()
+            # Sorted lists of the order years (latest year is the default) and product categories
+            order_years_list = catalog.options("Order Year")
+            category_list = catalog.options("Category")
 
             # Sidebar for Sales Scenario
             with st.sidebar:
@@ -47,17 +46,16 @@ class SalesScenario:
                 )
 
                 if selected_years:
-                    df_filtered_by_year = df[df["Order Date"].dt.year.isin(selected_years)]
-                    # Extract unique dates from "Order Date" column and convert to list
-                    order_dates_list = df_filtered_by_year["Order Date"].dt.date.unique().tolist()
+                    # First and last order date of the selected years
+                    min_date, max_date = catalog.date_bounds(selected_years)
 
                     st.markdown("#### Filter by Order Date Range")
 
                     date_range = st.slider(
                         "Order Date Range:",
-                        min_value=min(order_dates_list),
-                        max_value=max(order_dates_list),
-                        value=(min(order_dates_list), max(order_dates_list)),
+                        min_value=min_date,
+                        max_value=max_date,
+                        value=(min_date, max_date),
                         format="YYYY-MM-DD"
                     )
 
@@ -67,26 +65,25 @@ class SalesScenario:
                     st.session_state.switch_view('analysis')
 
             if selected_years:
-                df_filtered_by_year = df[df["Order Date"].dt.year.isin(selected_years)]
-
-                filtered_df = df_filtered_by_year.query(
-                    "`Order Date` >= @pd.Timestamp(@date_range[0]) and `Order Date` <= @pd.Timestamp(@date_range[1]) "
-                    "and `Category` in @selected_categories"
-                )
+                # Tables of the sales analysis for the selected categories, years and date range
+                sales_filters = {'Order Year': selected_years, 'Category': selected_categories,
+                                 'Order Date': date_range}
+                results = analytics.analyze('sales', dataset, sales_filters)
 
                 # Display warning if df empty
-                if filtered_df.empty:
+                if results['rows'] == 0:
                     st.warning("No sales data available with current filter applied.", icon='⚠️')
                 else:
                     # Display the sales bar chart
                     st.subheader("Sales Overview")
 
                     # Enhanced Bar Chart
-                    sales_chart = alt.Chart(filtered_df).mark_bar().encode(
+                    category_sales = results['category_sales']
+                    sales_chart = alt.Chart(category_sales).mark_bar().encode(
                         x=alt.X('Category:O', sort='-y', title='Category'),
-                        y=alt.Y('sum(Sales):Q', title='Total Sales'),
+                        y=alt.Y('Sales:Q', title='Total Sales'),
                         color=alt.Color('Category:N', legend=None, scale=alt.Scale(scheme='paired')),
-                        tooltip=['Category', 'sum(Sales)']
+                        tooltip=['Category', 'Sales']
                     ).properties(
                         width=700,
                         height=400,
@@ -100,15 +97,11 @@ class SalesScenario:
                         strokeOpacity=0
                     ).interactive()
 
-                    st.altair_chart(sales_chart, use_container_width=True)
-
-                    # This groups the df by sub-category and appends aggregates of one or more columns
-                    sales_summary = df.groupby('Sub-Category').agg({'Sales': 'sum'}).reset_index()
-
-                    sorted_sales_summary = sales_summary.sort_values(by="Sales", ascending=False)
+                    performance_trace.altair_chart(sales_chart, use_container_width=True)
 
-                    top_5_sub_categories = sorted_sales_summary.head(5)
-                    flop_5_sub_categories = sorted_sales_summary.tail(5)
+                    # Sub-categories with the highest and lowest sales of the whole dataset
+                    top_5_sub_categories = results['top_sub_categories']
+                    flop_5_sub_categories = results['flop_sub_categories']
 
                     col1, col2 = st.columns(2)
 
@@ -122,43 +115,41 @@ class SalesScenario:
 
                     st.write("")
                     # Category specific analysis for selected categories
-                    for category in selected_categories:
-                        category_df = filtered_df[filtered_df['Category'] == category]
+                    category_results = results['categories']
 
-                        if category_df.empty:
+                    for category in selected_categories:
+                        if category not in category_results:
                             st.info(f"No data available for {category} with current filter applied.", icon='⚠️')
                         else:
                             st.subheader(f"Category Specific Analysis for _{category}_", divider="gray")
 
                             chart_title = f"Sales by Sub-Category for Category {category}"
 
-                            sales_sub_category = alt.Chart(category_df).mark_bar().encode(
+                            monthly_sales = category_results[category]['monthly_sales']
+                            sub_category_sales = category_results[category]['sub_category_sales']
+                            sales_sub_category = alt.Chart(sub_category_sales).mark_bar().encode(
                                 x=alt.X('Sub-Category:O', sort='-y', title='Sub-Category'),
-                                y=alt.Y('sum(Sales):Q', title='Sales per Sub-Category'),
+                                y=alt.Y('Sales:Q', title='Sales per Sub-Category'),
                                 color='Sub-Category:N',
-                                tooltip=['Sub-Category', 'sum(Sales)']  # Displayed when hovering over a bar
+                                tooltip=['Sub-Category', 'Sales']  # Displayed when hovering over a bar
                             ).properties(
                                 width=600,
                                 height=400,
                                 title=chart_title
                             )
 
-                            st.altair_chart(sales_sub_category, use_container_width=True)
-
-                            product_sales_summary = category_df.groupby('Product Name').agg({'Sales': 'sum'}).reset_index()
-
-                            sorted_prod_sum = product_sales_summary.sort_values(by="Sales", ascending=False)
+                            performance_trace.altair_chart(sales_sub_category, use_container_width=True)
 
-                            top_5_products = sorted_prod_sum.head(5)
+                            top_5_products = category_results[category]['top_products']
                             st.write(f"**Top Five Most Sold Products in {category}**")
                             st.dataframe(top_5_products)
 
                             # Line chart for sales trend over time
-                            sales_trend_chart = alt.Chart(category_df).mark_line(point=True).encode(
-                                x=alt.X('yearmonth(Order Date):T', title='Order Date (Year-Month)'),
-                                y='sum(Sales):Q',
+                            sales_trend_chart = alt.Chart(monthly_sales).mark_line(point=True).encode(
+                                x=alt.X('yearmonth(Order Month):T', title='Order Date (Year-Month)'),
+                                y='Sales:Q',
                                 color=alt.Color('Sub-Category:N', scale=alt.Scale(scheme='category20')),
-                                tooltip=['yearmonth(Order Date):T', 'sum(Sales):Q', 'Sub-Category:N']
+                                tooltip=['yearmonth(Order Month):T', 'Sales:Q', 'Sub-Category:N']
                             ).properties(
                                 width=600,
                                 height=400,
@@ -175,7 +166,7 @@ class SalesScenario:
                                 strokeOpacity=0
                             ).interactive()
 
-                            st.altair_chart(sales_trend_chart, use_container_width=True)
+                            performance_trace.altair_chart(sales_trend_chart, use_container_width=True)
 
             else:
                 st.warning("No sales data available with current filter applied.", icon="⚠️")
@@ -185,7 +176,7 @@ class SalesScenario:
             uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
             if uploaded_file is not None:
                 try:
-                    st.session_state.df = pd.read_csv(uploaded_file)
+                    st.session_state.dataset = prepared_dataset.load_dataset(uploaded_file)
                     st.success("File uploaded successfully!")
                 except Exception as e:
                     st.error(f"Error uploading file: {e}")
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import tempfile
+import weakref
+from contextlib import closing
+import numpy as np
+import pandas as pd
+import column_catalog
+import dataset_cache
+import olap_cube
+import performance_trace
+import prepared_dataset
+
+# SQLite storage backend. The prepared rows of an uploaded file are written to a local database file and dropped
+# from memory, the filters and groupings of the scenarios are pushed down as parameterized SQL and only the group
+# sums come back. Like in out-of-core mode the cube and the column catalog for the sidebars stay in memory, they
+# are small.
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sqlite_store")
+
+# Databases of the datasets of this process, see dataset_cache.process_directory
+PROCESS_STORE_DIR = dataset_cache.process_directory(STORE_DIR)
+
+TABLE = "orders"
+
+# Rows converted and inserted at once
+WRITE_ROWS = 50_000
+
+# Columns with an index, the ones the sidebars filter on
+INDEXED_COLUMNS = ["Order Date", "Order Year", "Market", "Country", "Category", "Sub-Category", "Segment"]
+
+
+def quote(column):
+    # Column names come from the code (never from the user), they only need quoting because of the spaces
+    return '"' + column.replace('"', '""') + '"'
+
+
+def sql_value(value):
+    # sqlite3 can't bind numpy scalars (e.g. the years of the sidebar)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def where_clause(filters, date_range):
+    # WHERE clause and its parameters for a filter spec without the "Order Date" range, which is passed separately
+    conditions = []
+    params = []
+    for column, values in filters.items():
+        if values is None:
+            continue
+        if isinstance(values, range) and values.step == 1:
+            # Age slider, one BETWEEN instead of a parameter per age
+            conditions.append(f"{quote(column)} BETWEEN ? AND ?")
+            params += [values.start, values.stop - 1]
+        elif len(values) == 0:
+            conditions.append("0")  # Nothing selected, no rows like for an in-memory dataset
+        else:
+            conditions.append(f"{quote(column)} IN ({', '.join('?' * len(values))})")
+            params += [sql_value(value) for value in values]
+    if date_range is not None:
+        conditions.append(f"{quote('Order Date')} BETWEEN ? AND ?")
+        params += [pd.Timestamp(date).strftime('%Y-%m-%d') for date in date_range]
+    return " AND ".join(conditions) or "1", params
+
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class SqliteDataset:
+    # Same interface for the scenarios as PreparedDataset, but the rows are in the database
+    out_of_core = True
+
+    def __init__(self, df, version):
+        self.version = version
+        # Own database file for every build, a session can still use an earlier build of the same file. The file is
+        # removed together with the dataset, when it was dropped from the shared datasets and no session uses it.
+        os.makedirs(PROCESS_STORE_DIR, exist_ok=True)
+        handle, self.path = tempfile.mkstemp(prefix=f"{version}-", suffix=".sqlite", dir=PROCESS_STORE_DIR)
+        os.close(handle)
+        weakref.finalize(self, remove_file, self.path)
+        self.n_rows = len(df)
+        self.df = df.head(1000).copy()  # Only the first rows stay in memory, they are shown after the upload
+        self.cube = olap_cube.OlapCube(df)
+        self.catalog = column_catalog.ColumnCatalog(df)
+        self.write(df)
+
+    def write(self, df):
+        # Dates are stored as ISO text, so they sort and compare correctly as strings. They are converted block by
+        # block while inserting, a converted copy of the whole frame would double the memory while writing.
+        date_columns = [column for column in df.columns if pd.api.types.is_datetime64_any_dtype(df[column])]
+        with closing(sqlite3.connect(self.path)) as connection:
+            for start in range(0, len(df), WRITE_ROWS):
+                rows = df.iloc[start:start + WRITE_ROWS]
+                rows = rows.assign(**{column: rows[column].dt.strftime('%Y-%m-%d') for column in date_columns})
+                rows.to_sql(TABLE, connection, index=False, if_exists='append')
+            for column in INDEXED_COLUMNS:
+                if column in df.columns:
+                    connection.execute(f"CREATE INDEX {quote('idx ' + column)} ON {TABLE} ({quote(column)})")
+            connection.commit()
+
+    def query(self, sql, params):
+        # Every query gets its own read-only connection, sessions and warm-up threads query from different threads
+        with closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def group_sums(self, filters, groupings):
+        # Same result as analytics.group_sums for in-memory datasets, one GROUP BY query per grouping
+        filters = dict(filters)
+        date_range = filters.pop('Order Date', None)
+        where, params = where_clause(filters, date_range)
+
+        results = []
+        with performance_trace.span('filter', backend='sqlite') as record:
+            for by, measures in groupings:
+                aggregates = [f"COUNT(*) AS {quote(measure)}" if measure == 'Count'
+                              else f"TOTAL({quote(measure)}) AS {quote(measure)}" for measure in measures]
+                # Rows with a missing group value are left out, like in pandas groupby
+                group_where = " AND ".join([where] + [f"{quote(column)} IS NOT NULL" for column in by])
+                group_columns = ", ".join(map(quote, by))
+                sums = self.query(f"SELECT {group_columns}, {', '.join(aggregates)} FROM {TABLE} "
+                                  f"WHERE {group_where} GROUP BY {group_columns} ORDER BY {group_columns}", params)
+                if 'Order Month' in by:
+                    sums['Order Month'] = pd.to_datetime(sums['Order Month'])
+                results.append(sums)
+            record['queries'] = len(groupings)
+        return results
+
+
+def build_dataset(file, version):
+    # The rows are parsed (or loaded from the file cache of the in-memory backend) and prepared like for an in-memory
+    # dataset, written to the database and then dropped. They aren't stored in the file cache, the database is the
+    # copy on disk of this backend.
+    df = prepared_dataset.read_dataset(file, version, store=False)
+    if df['Order Date'].isna().all():  # Also if there are no rows at all
+        raise ValueError("the file doesn't contain any orders")
+    with performance_trace.span('prepare', rows=len(df), backend='sqlite'):
+        return SqliteDataset(prepared_dataset.PreparedDataset.prepare(df), version)
+
+
+def load_sqlite_dataset(file):
+    version = dataset_cache.content_hash(file.getvalue())
+    # Not the same shared dataset as for the in-memory backend, the results of both are the same though
+    shared_dataset = prepared_dataset.get_shared_dataset(f"sqlite-{version}", lambda: build_dataset(file, version))
+    return prepared_dataset.DatasetView(shared_dataset)
+
+
+# Databases left by server processes that don't run anymore (e.g. before a restart)
+dataset_cache.remove_stale_directories(STORE_DIR)
@@ -0,0 +1,160 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import data_loader
+
+# Generates superstore files with the same columns and formats as global_superstore.csv, but with any number of rows.
+# Locations, products, names and the measures are sampled from the shipped file, so the values and their
+# combinations (country and market, category and sub-category, ...) look like the real data.
+
+SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "global_superstore.csv")
+
+# Row counts of the benchmark datasets
+SIZES = {"100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Increased when the generated data changes, so datasets generated before (e.g. by benchmark.py) aren't reused
+GENERATOR_VERSION = 2
+
+LOCATION_COLUMNS = ["City", "State", "Country", "Postal Code", "Market", "Region"]
+PRODUCT_COLUMNS = ["Product ID", "Category", "Sub-Category", "Product Name"]
+ORDER_COLUMNS = ["Sales", "Quantity", "Discount", "Profit", "Shipping Cost", "Order Priority", "Payment Method"]
+
+# Rows are generated and written in blocks, so 10M rows don't have to fit in memory at once
+CHUNK_ROWS = 500_000
+
+
+def customer_count(n_rows):
+    # A larger business has more customers, about 20 orders per customer
+    return max(1_000, n_rows // 20)
+
+
+def product_count(n_rows):
+    # The catalog grows slower than the number of orders, to tens of thousands of products like a real store
+    return int(np.clip(n_rows // 5, 1_000, 50_000))
+
+
+def read_seed(seed_file=SEED_FILE):
+    seed = pd.read_csv(seed_file, dtype={"Postal Code": "float64"})
+    seed["Order Date"] = pd.to_datetime(seed["Order Date"], format=data_loader.DATE_FORMATS["Order Date"])
+    seed["Ship Date"] = pd.to_datetime(seed["Ship Date"], format=data_loader.DATE_FORMATS["Ship Date"])
+    seed["Ship Days"] = (seed["Ship Date"] - seed["Order Date"]).dt.days
+    return seed
+
+
+def skewed_weights(n, rng):
+    # Few popular and many rarely ordered items, in random order
+    weights = 1 / np.arange(1, n + 1) ** 0.8
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def make_customers(seed, n_customers, rng):
+    # Every customer has a fixed name, gender, segment, date of birth and location.
+    # Names are new combinations of the first and last names of the seed file.
+    names = seed["Customer Name"].str.split(" ", n=1, expand=True)
+    first_names = names[0].unique()
+    last_names = names[1].dropna().unique()
+
+    segments = seed["Segment"].value_counts(normalize=True)
+    genders = seed["Gender"].value_counts(normalize=True)
+    locations = seed[LOCATION_COLUMNS].drop_duplicates().reset_index(drop=True)
+
+    customers = locations.iloc[rng.integers(0, len(locations), n_customers)].reset_index(drop=True)
+    customers["Customer Name"] = (pd.Series(rng.choice(first_names, n_customers)) + " "
+                                  + pd.Series(rng.choice(last_names, n_customers)))
+    customers["Gender"] = rng.choice(genders.index, n_customers, p=genders.to_numpy())
+    customers["Segment"] = rng.choice(segments.index, n_customers, p=segments.to_numpy())
+
+    # Corporate customers have no date of birth, like in the seed file
+    dob = pd.Timestamp("1945-01-01") + pd.to_timedelta(rng.integers(0, 55 * 365, n_customers), unit="D")
+    customers["Customer DOB"] = pd.Series(dob.strftime("%Y-%m-%d")).where(customers["Segment"] != "Corporate")
+    return customers
+
+
+def make_products(seed, n_products, rng):
+    # Products of the seed file, extended with model variants until the catalog has n_products entries.
+    # Every product gets its own name, also products of the seed file sharing a name with another Product ID.
+    products = seed[PRODUCT_COLUMNS].drop_duplicates("Product ID").reset_index(drop=True)
+    picks = np.arange(n_products) % len(products)
+    variants = pd.Series(np.arange(n_products) // len(products))
+    catalog = products.iloc[picks].reset_index(drop=True)
+
+    has_variant = variants > 0
+    catalog.loc[has_variant, "Product ID"] = catalog["Product ID"] + "-" + variants.astype(str)
+    models = catalog.groupby("Product Name").cumcount()
+    has_model = models > 0
+    catalog.loc[has_model, "Product Name"] = catalog["Product Name"] + " (Model " + models.astype(str) + ")"
+    return catalog.iloc[rng.permutation(n_products)].reset_index(drop=True)
+
+
+def order_dates(seed, n_rows, rng):
+    # Months are drawn with the share of orders they have in the seed file, the day within the month is random
+    months = seed["Order Date"].dt.to_period("M").value_counts(normalize=True).sort_index()
+    month_start = months.index.to_timestamp()[rng.choice(len(months), n_rows, p=months.to_numpy())]
+    days_in_month = month_start.days_in_month.to_numpy()
+    return month_start + pd.to_timedelta(np.floor(rng.random(n_rows) * days_in_month), unit="D")
+
+
+def format_date(dates):
+    # Same format as the seed file, e.g. "5 02 2013"
+    dates = pd.Series(dates)
+    return dates.dt.day.astype(str) + dates.dt.strftime(" %m %Y")
+
+
+def generate_chunk(seed, customers, products, customer_weights, product_weights, n_rows, rng):
+    customer_rows = customers.iloc[rng.choice(len(customers), n_rows, p=customer_weights)].reset_index(drop=True)
+    product_rows = products.iloc[rng.choice(len(products), n_rows, p=product_weights)].reset_index(drop=True)
+
+    # Ship mode and shipping time, and the measures of an order are sampled together,
+    # so e.g. discount and profit still belong to each other
+    shipping = seed[["Ship Mode", "Ship Days"]].iloc[rng.integers(0, len(seed), n_rows)].reset_index(drop=True)
+    orders = seed[ORDER_COLUMNS].iloc[rng.integers(0, len(seed), n_rows)].reset_index(drop=True)
+    for measure in ["Sales", "Profit", "Shipping Cost"]:
+        orders[measure] = (orders[measure] * rng.lognormal(0, 0.1, n_rows)).round(2)
+
+    order_date = order_dates(seed, n_rows, rng)
+    ship_date = order_date + pd.to_timedelta(shipping["Ship Days"].to_numpy(), unit="D")
+
+    chunk = pd.concat([customer_rows, product_rows, orders], axis=1)
+    chunk["Order Date"] = format_date(order_date)
+    chunk["Ship Date"] = format_date(ship_date)
+    chunk["Ship Mode"] = shipping["Ship Mode"]
+    return chunk[seed.columns.drop("Ship Days")]
+
+
+def write_dataset(path, n_rows, seed_file=SEED_FILE, random_state=0):
+    # Writes a file with n_rows orders, the same random_state gives the same file
+    rng = np.random.default_rng(random_state)
+    seed = read_seed(seed_file)
+    customers = make_customers(seed, customer_count(n_rows), rng)
+    products = make_products(seed, product_count(n_rows), rng)
+    customer_weights = skewed_weights(len(customers), rng)
+    product_weights = skewed_weights(len(products), rng)
+
+    # Written to a temporary file first, so an interrupted run doesn't leave a half written dataset behind
+    tmp_path = f"{path}.tmp"
+    for start in range(0, n_rows, CHUNK_ROWS):
+        chunk = generate_chunk(seed, customers, products, customer_weights, product_weights,
+                               min(CHUNK_ROWS, n_rows - start), rng)
+        chunk.to_csv(tmp_path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic superstore datasets.")
+    parser.add_argument("sizes", nargs="+", choices=SIZES, help="row counts of the datasets to generate")
+    parser.add_argument("--output-dir", default=".", help="directory the files are written to")
+    parser.add_argument("--random-state", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for size in args.sizes:
+        path = os.path.join(args.output_dir, f"superstore_{size}.csv")
+        write_dataset(path, SIZES[size], random_state=args.random_state)
+        print(f"{path}: {SIZES[size]:,} rows")
+
+
+if __name__ == "__main__":
+    main()